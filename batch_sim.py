@@ -0,0 +1,198 @@
+# file: batch_sim.py
+#
+# Batch simulation for difficulty tuning: plays thousands of headless games of paint_hit.py
+# with a parameterized bot, spread over all cores, and reports score, lives-lost and
+# session-length distributions for every (mode, difficulty, bot) setting:
+#
+#   python batch_sim.py --games 500
+#   python batch_sim.py --difficulties Hard --bots average 300/400/12 --speed-multiplier Hard=1.3
+#   python batch_sim.py --modes TIMED_CHALLENGE --duration 90 --json sweep.json
+#
+# Game seeds are shared between settings, so each setting sees the same target rolls.
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import concurrent.futures
+
+os.environ['PAINT_HIT_HEADLESS'] = '1'
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import pygame
+import paint_hit as ph
+
+# Bot presets: (reaction ms before a new target can be shot, ms between shots, aim error in px)
+BOTS = {
+    'casual': (700, 900, 30),
+    'average': (450, 600, 18),
+    'expert': (250, 350, 8),
+}
+
+
+# --- Bot ---
+# An input source that plays by reading the game state: it shoots the lowest target it has
+# seen for at least its reaction time, aiming at the bullseye with Gaussian error.
+class Bot:
+    def __init__(self, rng, reaction_ms, shot_interval_ms, aim_error):
+        self.rng = rng
+        self.reaction_ticks = ph.ms_to_ticks(reaction_ms)
+        self.shot_ticks = ph.ms_to_ticks(shot_interval_ms)
+        self.aim_error = aim_error
+        self.game = None
+        self.tick = 0
+        self.cooldown = 0
+        self.first_seen = {}  # depth_seq -> tick the target was first seen
+        self.pos = (ph.SCREEN_WIDTH // 2, ph.SCREEN_HEIGHT // 2)
+
+    def get_pos(self):
+        return self.pos
+
+    def get_events(self):
+        self.tick += 1
+        self.cooldown -= 1
+        targets = [target for target in self.game.targets if not target.falling]
+        self.first_seen = {target.depth_seq: self.first_seen.get(target.depth_seq, self.tick) for target in targets}
+        if self.cooldown > 0:
+            return []
+        ready = [target for target in targets if self.tick - self.first_seen[target.depth_seq] >= self.reaction_ticks]
+        if not ready:
+            return []
+        target = max(ready, key=lambda t: t.y)
+        self.pos = (round(self.rng.gauss(target.target_center_x, self.aim_error)),
+                    round(self.rng.gauss(target.target_center_y, self.aim_error)))
+        self.cooldown = self.shot_ticks
+        return [pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=self.pos)]
+
+def parse_bot(name):
+    if name in BOTS:
+        return BOTS[name]
+    try:
+        reaction_ms, shot_interval_ms, aim_error = (float(part) for part in name.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"bot must be one of {', '.join(BOTS)} or REACTION_MS/INTERVAL_MS/AIM_PX, not {name!r}")
+    return reaction_ms, shot_interval_ms, aim_error
+
+
+# --- Workers ---
+def init_worker():
+    ph.init(headless=True)
+    # Nothing is drawn, so targets keep their geometry but skip compositing their images
+    ph.Target.compose_images = False
+
+def play_game(setting, seed, tuning, max_frames):
+    mode, difficulty, bot = setting
+    player = Bot(random.Random(f"bot-{seed}"), *parse_bot(bot))
+    engine = ph.HeadlessEngine(seed=seed, mode=mode, speed_setting=difficulty, challenge_duration=tuning['duration'],
+                               input_source=player)
+    game = engine.game
+    player.game = game
+    game.speed_multipliers.update(tuning['speed_multipliers'])
+    game.spawn_delay_ms = tuning['spawn_delay_ms']
+    game.max_combo_time = tuning['combo_window']
+    game.combo_bonus_step = tuning['combo_bonus']
+    best_combo = 0
+    while engine.frames < max_frames and not game.game_over:
+        engine.step()
+        best_combo = max(best_combo, game.combo_counter)
+    return game.score, 5 - game.lives, game.sim_ticks / ph.SIM_HZ, best_combo, not game.game_over
+
+def play_batch(setting, seeds, tuning, max_frames):
+    return setting, [play_game(setting, seed, tuning, max_frames) for seed in seeds]
+
+
+# --- Reporting ---
+def distribution(samples):
+    ordered = sorted(samples)
+    return {'mean': sum(ordered) / len(ordered), 'p10': ph.percentile(ordered, 10),
+            'p50': ph.percentile(ordered, 50), 'p90': ph.percentile(ordered, 90)}
+
+def summarize(games):
+    scores, lives_lost, seconds, combos, capped = zip(*games)
+    return {
+        'games': len(games),
+        'score': distribution(scores),
+        'lives_lost': distribution(lives_lost),
+        'lives_lost_histogram': [lives_lost.count(lost) for lost in range(6)],
+        'session_seconds': distribution(seconds),
+        'best_combo': distribution(combos),
+        'capped': sum(capped),
+    }
+
+def print_report(report):
+    print(f"{'setting':<34} {'games':>5}  {'score p10/p50/p90':>20} {'mean':>7}  {'lives lost 0..5':<24} "
+          f"{'length s p10/p50/p90':>21}  {'combo p50':>9}  {'capped':>6}")
+    for name, summary in report.items():
+        score, length = summary['score'], summary['session_seconds']
+        histogram = "/".join(f"{count * 100 // summary['games']}" for count in summary['lives_lost_histogram'])
+        print(f"{name:<34} {summary['games']:>5}  {score['p10']:>6.0f}/{score['p50']:>6.0f}/{score['p90']:>6.0f} "
+              f"{score['mean']:>7.0f}  {histogram + ' %':<24} {length['p10']:>6.0f}/{length['p50']:>6.0f}/{length['p90']:>7.0f}  "
+              f"{summary['best_combo']['p50']:>9.0f}  {summary['capped']:>6}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Paint (H)it batch simulation for difficulty tuning")
+    parser.add_argument('--games', type=int, default=200, help="games per setting (default 200)")
+    parser.add_argument('--modes', nargs='+', choices=['PLAYING', 'TIMED_CHALLENGE'], default=['PLAYING'])
+    parser.add_argument('--difficulties', nargs='+', choices=list(ph.SPEED_MULTIPLIERS), default=list(ph.SPEED_MULTIPLIERS))
+    parser.add_argument('--bots', nargs='+', default=list(BOTS),
+                        help=f"bot presets ({', '.join(BOTS)}) or REACTION_MS/INTERVAL_MS/AIM_PX triples")
+    parser.add_argument('--duration', type=int, default=60, help="timed challenge length in seconds")
+    parser.add_argument('--max-minutes', type=float, default=10, help="stop a game after this much game time (default 10)")
+    parser.add_argument('--seed', type=int, default=0, help="first game seed; game i of every setting uses seed + i")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes (default: all cores)")
+    parser.add_argument('--speed-multiplier', action='append', default=[], metavar='DIFFICULTY=VALUE',
+                        help="override a target speed multiplier, e.g. Hard=1.3")
+    parser.add_argument('--spawn-delay', type=int, nargs=2, default=list(ph.SPAWN_DELAY_MS), metavar=('MIN_MS', 'MAX_MS'))
+    parser.add_argument('--combo-window', type=int, default=ph.COMBO_WINDOW_TICKS, help="combo window in ticks")
+    parser.add_argument('--combo-bonus', type=int, default=ph.COMBO_BONUS_STEP, help="bonus per combo step")
+    parser.add_argument('--json', dest='json_path', help="write the report to this JSON file")
+    args = parser.parse_args()
+    for bot in args.bots:
+        try:
+            parse_bot(bot)
+        except argparse.ArgumentTypeError as e:
+            parser.error(str(e))
+    speed_multipliers = {}
+    for override in args.speed_multiplier:
+        difficulty, _, value = override.partition('=')
+        if difficulty not in ph.SPEED_MULTIPLIERS:
+            parser.error(f"unknown difficulty in --speed-multiplier {override!r}")
+        speed_multipliers[difficulty] = float(value)
+    tuning = {
+        'speed_multipliers': speed_multipliers,
+        'spawn_delay_ms': tuple(args.spawn_delay),
+        'combo_window': args.combo_window,
+        'combo_bonus': args.combo_bonus,
+        'duration': args.duration,
+    }
+
+    settings = [(mode, difficulty, bot) for mode in args.modes for difficulty in args.difficulties for bot in args.bots]
+    seeds = list(range(args.seed, args.seed + args.games))
+    # Small chunks keep every core busy to the end; each chunk is a handful of whole games
+    chunk = max(1, min(25, args.games // max(1, args.workers)))
+    max_frames = int(args.max_minutes * 60 * ph.SIM_HZ)
+    results = {setting: [] for setting in settings}
+    start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker) as pool:
+        futures = [pool.submit(play_batch, setting, seeds[i:i + chunk], tuning, max_frames)
+                   for setting in settings for i in range(0, len(seeds), chunk)]
+        for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+            setting, games = future.result()
+            results[setting].extend(games)
+            print(f"\r{done}/{len(futures)} batches", end='', file=sys.stderr, flush=True)
+    elapsed = time.perf_counter() - start
+    total = len(settings) * args.games
+    print(f"\r{total} games in {elapsed:.1f} s ({total / elapsed:.1f} games/s, {args.workers} workers)", file=sys.stderr)
+
+    report = {"/".join(setting): summarize(results[setting]) for setting in settings}
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'version': ph.__version__, 'tuning': tuning, 'bots': {bot: parse_bot(bot) for bot in args.bots},
+                       'settings': report}, f, indent=4)
+
+if __name__ == '__main__':
+    main()
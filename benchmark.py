@@ -0,0 +1,240 @@
+# file: benchmark.py
+#
+# Micro and macro benchmarks for the render and hit-test hot paths of paint_hit.py.
+# Runs headless. Prints per-case percentiles and can write or compare JSON results:
+#
+#   python benchmark.py --json results.json
+#   python benchmark.py --baseline baseline.json --threshold 0.15
+#
+# The exit code is 1 when any case's p50 regressed past the threshold.
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+
+os.environ['PAINT_HIT_HEADLESS'] = '1'
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import pygame
+import paint_hit as ph
+
+PERCENTILES = (50, 90, 99)
+
+
+# --- Statistics ---
+def summarize(samples_ms):
+    ordered = sorted(samples_ms)
+    summary = {f"p{pct}": ph.percentile(ordered, pct) for pct in PERCENTILES}
+    summary['mean'] = sum(ordered) / len(ordered)
+    summary['max'] = ordered[-1]
+    summary['samples'] = len(ordered)
+    return summary
+
+def measure(fn, iterations, warmup, setup=None):
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        fn()
+    samples = []
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        start = time.perf_counter_ns()
+        fn()
+        samples.append((time.perf_counter_ns() - start) / 1e6)
+    return summarize(samples)
+
+
+# --- Fixtures ---
+def make_engine(seed=0):
+    return ph.HeadlessEngine(seed=seed)
+
+def populate(game, count, rng, max_scale=1.0):
+    game.targets.empty()
+    for _ in range(count):
+        target = ph.Target(ph.silhouette_img, ph.target_img, None, 1.0, rng, game.lose_life)
+        target.y = rng.uniform(80, 640)
+        target.x = rng.uniform(100, ph.SCREEN_WIDTH - 100)
+        target.scale = rng.uniform(0.1, max_scale)
+        target.update_image()
+        game.targets.add(target)
+
+
+# --- Cases ---
+# Each case yields (name, fn, iterations) or (name, fn, iterations, setup); fn is called once
+# per sample, and setup, when given, runs untimed before each one.
+def update_image_cases(quick):
+    rng = random.Random(1)
+    iterations = 100 if quick else 500
+    for scale in (0.2, 0.6, 1.0, 1.8):
+        for splat_count in (0, 10, 100):
+            target = ph.Target(ph.silhouette_img, ph.target_img, None, 1.0, rng)
+            target.scale = scale
+            target.update_image()
+            for _ in range(splat_count):
+                hit = (rng.uniform(target.rect.left, target.rect.right), rng.uniform(target.rect.top, target.rect.bottom))
+                target.add_splat(hit, rng.choice([ph.RED, ph.GREEN, ph.BLUE, ph.YELLOW]))
+
+            # Grow like a live target does, wrapping so the scale stays near the case value
+            def grow(target=target, scale=scale):
+                target.scale += 0.003
+                if target.scale > scale + 0.1:
+                    target.scale = scale
+                target.update_image()
+            yield f"update_image/scale={scale}/splats={splat_count}", grow, iterations
+
+def draw_gameplay_cases(quick):
+    for count in (1, 10, 100, 1000):
+        engine = make_engine()
+        populate(engine.game, count, random.Random(count))
+        iterations = 20 if count >= 1000 else (50 if quick else 200)
+        yield f"draw_gameplay/targets={count}", engine.game.draw_gameplay, iterations
+
+def hit_test_cases(quick):
+    # Small targets (max scale 0.3) are the dense stress-mode case, where most clicks miss most targets
+    for count, max_scale in ((10, 1.0), (100, 1.0), (500, 1.0), (500, 0.3)):
+        engine = make_engine()
+        game = engine.game
+        rng = random.Random(count)
+        populate(game, count, rng, max_scale)
+        clicks = [(rng.randrange(ph.SCREEN_WIDTH), rng.randrange(ph.SCREEN_HEIGHT)) for _ in range(100)]
+
+        # The per-click lookup handle_gameplay performs, without mutating the targets
+        def storm(game=game, clicks=clicks):
+            for pos in clicks:
+                for target in game.targets.hit_candidates(pos):
+                    if target.score_body(pos) or target.is_face_hit(pos):
+                        break
+        suffix = "/small" if max_scale < 1.0 else ""
+        yield f"hit_test/targets={count}/clicks=100{suffix}", storm, 20 if quick else 100
+
+    # Full click handling, including splat baking and combo scoring. Clicks knock targets
+    # down, so every sample starts from the same freshly populated layout.
+    engine = make_engine()
+    game = engine.game
+    rng = random.Random(7)
+    events = [pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=(rng.randrange(ph.SCREEN_WIDTH), rng.randrange(ph.SCREEN_HEIGHT)))
+              for _ in range(100)]
+
+    def repopulate(game=game):
+        populate(game, 100, random.Random(8))
+        game.score = game.combo_counter = 0
+
+    def click_storm(game=game, events=events):
+        game.handle_gameplay(events)
+    yield "handle_gameplay/targets=100/clicks=100", click_storm, 10 if quick else 50, repopulate
+
+def file_explorer_cases(quick):
+    directory = tempfile.mkdtemp(prefix="paint_hit_bench_")
+    for i in range(500):
+        os.mkdir(os.path.join(directory, f"folder_{i:05d}"))
+    for i in range(10000):
+        open(os.path.join(directory, f"photo_{i:05d}_with_a_fairly_long_descriptive_file_name.jpg"), 'w').close()
+    engine = make_engine()
+    game = engine.game
+    game.state = 'FILE_EXPLORER'
+    game.file_explorer_path = directory
+    try:
+        for offset in (0, 250000):
+            def draw(game=game, offset=offset):
+                game.scroll_offset = offset
+                game.draw_file_explorer()
+            yield f"draw_file_explorer/entries=10500/scroll={offset}", draw, 10 if quick else 50
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def swarm_cases(quick):
+    if ph.np is None:
+        print("swarm: numpy is not installed, skipping")
+        return
+    for count in (1000, 5000):
+        engine = ph.HeadlessEngine(swarm_size=count)
+        swarm = engine.game.swarm
+        swarm.spawn(count)
+        for _ in range(300):
+            swarm.update()
+
+        # One steady-state tick: top the population back up, then move everything
+        def tick(swarm=swarm, count=count):
+            swarm.spawn(count - len(swarm))
+            swarm.update()
+        yield f"swarm_update/targets={count}", tick, 100 if quick else 500
+        yield f"swarm_draw/targets={count}", engine.game.draw_gameplay, 10 if quick else 50
+
+SUITES = {
+    'update_image': update_image_cases,
+    'draw_gameplay': draw_gameplay_cases,
+    'hit_test': hit_test_cases,
+    'file_explorer': file_explorer_cases,
+    'swarm': swarm_cases,
+}
+
+
+# --- Reporting ---
+def run_suites(names, quick, case_filter):
+    results = {}
+    for name in names:
+        for case_name, fn, iterations, *setup in SUITES[name](quick):
+            if case_filter and case_filter not in case_name:
+                continue
+            results[case_name] = summary = measure(fn, iterations, warmup=max(1, iterations // 10), setup=setup[0] if setup else None)
+            print(f"{case_name:<48} " + "  ".join(f"p{pct}={summary[f'p{pct}']:8.3f}ms" for pct in PERCENTILES)
+                  + f"  max={summary['max']:8.3f}ms", flush=True)
+    return results
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for case_name, summary in results.items():
+        base = baseline.get('cases', {}).get(case_name)
+        if not base or base['p50'] <= 0:
+            continue
+        change = summary['p50'] / base['p50'] - 1
+        status = "REGRESSION" if change > threshold else "ok"
+        print(f"{case_name:<48} p50 {base['p50']:8.3f} -> {summary['p50']:8.3f}ms ({change:+.1%}) {status}")
+        if change > threshold:
+            regressions.append(case_name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Paint (H)it render and hit-test benchmarks")
+    parser.add_argument('suites', nargs='*', help=f"suites to run: {', '.join(SUITES)} (default: all)")
+    parser.add_argument('--filter', help="only run cases whose name contains this text")
+    parser.add_argument('--quick', action='store_true', help="fewer samples per case")
+    parser.add_argument('--json', dest='json_path', help="write results to this JSON file")
+    parser.add_argument('--baseline', help="compare p50 against this JSON results file")
+    parser.add_argument('--threshold', type=float, default=0.10, help="allowed p50 slowdown vs baseline (default 0.10)")
+    args = parser.parse_args()
+    unknown = [name for name in args.suites if name not in SUITES]
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(unknown)}")
+
+    ph.init(headless=True)
+    results = run_suites(args.suites or list(SUITES), args.quick, args.filter)
+    report = {
+        'version': ph.__version__,
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'platform': platform.platform(),
+        'cases': results,
+    }
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} case(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
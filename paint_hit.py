@@ -1,23 +1,39 @@
 # file: paint_hit.py
 
 import sys
+import gc
 import random
 import math
 import json
 import os
+import time
 import webbrowser
-
+import struct
+import hashlib
+import argparse
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+
+IMPORT_STARTED = time.perf_counter()
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
 
+# Headless mode runs the simulation with no window, e.g. for benchmarks and CI
+HEADLESS = os.environ.get('PAINT_HIT_HEADLESS') == '1' or '--headless' in sys.argv
+
 import pygame
 
+try:
+    import numpy as np
+except ImportError:  # Optional: only swarm mode needs it
+    np = None
+
 
 # --- Constants & Initialization ---
 __version__ = "0.8.2"
 __author__= "eth08"
 
-pygame.init()
-
 SCREEN_WIDTH, SCREEN_HEIGHT = 1000, 800
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -27,8 +43,91 @@ BLUE = (4,164,236)
 YELLOW = (252,220,4)
 GREY = (100, 100, 100)
 LIGHT_GREY = (170, 170, 170)
-HIGHSCORE_FILE = 'highscores.json'
+HIGHSCORE_FILE = 'highscores.json'  # Pre-leaderboard top 10, imported into LEADERBOARD_FILE once
+LEADERBOARD_FILE = 'leaderboard.db'
 CONFIG_FILE = 'config.json'
+# Boards show this many runs. Rank trees count scores up to RANK_TREE_SIZE - 1 (higher ones count as that)
+LEADERBOARD_SIZE = 10
+RANK_TREE_SIZE = 1 << 20
+
+# Composited target surfaces are shared between targets, bucketed by scale
+TARGET_SCALE_STEP = 0.01
+TARGET_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Splats are baked into a per-target decal layer at this fraction of the silhouette size
+SPLAT_LAYER_SCALE = 0.5
+# Splat atlas: pre-rotated variants per colour, at the one size splats are drawn
+SPLAT_ROTATION_STEPS = 16
+
+# Gameplay runs in fixed 1/60 s ticks; every per-tick constant below is tuned for that rate
+SIM_HZ = 60
+SIM_DT = 1.0 / SIM_HZ
+MAX_FRAME_TIME = 0.25  # Longer stalls are dropped instead of being simulated in one burst
+SPAWN_DELAY_MS = (1500, 3000)
+FIRST_SPAWN_DELAY_MS = 2000
+# Difficulty tuning. Each Game copies these, so a harness can override them per game.
+SPEED_MULTIPLIERS = {'Easy': 0.7, 'Normal': 1.0, 'Hard': 1.5}
+COMBO_WINDOW_TICKS = 180  # A bullseye within this many ticks of the last one extends the combo
+COMBO_BONUS_STEP = 10  # Each bullseye scores this much extra per combo step
+
+def ms_to_ticks(ms):
+    return max(1, round(ms * SIM_HZ / 1000))
+
+# Frame profiler: F3 toggles it (or start with PAINT_HIT_PROFILE=1), F4 dumps the trace
+PROFILE_BUFFER_FRAMES = 600
+PROFILE_PHASES = ('events', 'handle', 'update', 'draw', 'overlay', 'flip', 'tick')
+
+# Dirty-rect gameplay rendering ('render_mode': 'dirty' in config.json) falls back
+# to a full flip when the changed area exceeds this fraction of the screen
+DIRTY_RECT_MAX_FRACTION = 0.5
+
+# Quality governor ('quality_governor': false in config.json turns it off). It watches the
+# work time of the last QUALITY_WINDOW_FRAMES gameplay frames (the frame-cap wait excluded):
+# when their 90th percentile passes QUALITY_LOWER_FRACTION of the frame budget it drops a
+# level, and when it stays under QUALITY_RAISE_FRACTION it climbs back, no sooner than
+# QUALITY_RAISE_HOLD_FRAMES after the last drop.
+QUALITY_WINDOW_FRAMES = 60
+QUALITY_LOWER_FRACTION = 0.9
+QUALITY_RAISE_FRACTION = 0.5
+QUALITY_RAISE_HOLD_FRAMES = 300
+# (name, target image step stride, splatted target image step stride, lean HUD, spawn cap)
+QUALITY_LEVELS = (
+    ('full', 1, 1, False, None),
+    ('coarse scaling', 3, 3, False, None),
+    ('coarse splats', 3, 8, False, None),
+    ('lean HUD', 3, 8, True, None),
+    ('spawn cap', 3, 8, True, 12),
+)
+
+# File explorer listings are cached per path and re-read when the directory mtime changes
+DIRECTORY_RECHECK_SECONDS = 1.0
+DIRECTORY_CACHE_SIZE = 8
+
+# Config and score writes run on a background thread; a config change waits this long for
+# further changes so a burst of clicks is written once
+PERSIST_DELAY_SECONDS = 0.5
+
+# Decoded, pre-scaled assets are cached as raw pixels under the user cache directory
+# (PAINT_HIT_CACHE_DIR overrides it; set it to an empty string to disable the cache)
+ASSET_CACHE_VERSION = 1
+ASSET_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Live targets are indexed in a uniform grid of this cell size (pixels) for hit-testing
+TARGET_GRID_CELL = 100
+
+# Swarm mode (--swarm N, needs numpy): targets are drawn at this fraction of the normal
+# size, and the population is topped up to N over roughly this many ticks
+SWARM_SIZE_FACTOR = 0.25
+SWARM_FILL_TICKS = 300
+
+# Targets grow from scale 0.10 at spawn (y=60) by 0.003 per pixel of descent until they escape at y=650
+MAX_TARGET_SCALE = 1.9
+
+# Replay logs (--record DIR, --replay FILE): a fixed header, the face paths, then one
+# fixed-size record per input event
+REPLAY_MAGIC = b'PHRP'
+REPLAY_VERSION = 2  # Version 2 added spawn cap records; version 1 logs still load
+REPLAY_HEADER = struct.Struct('<4sHQBBIIqiiIIB')
+REPLAY_EVENT = struct.Struct('<IBhh')
 
 # Stylish UI palette
 BACKGROUND_COLOR = (24, 26, 29)
@@ -37,34 +136,405 @@ HOVER_COLOR = (70, 75, 80)
 TEXT_COLOR = (255, 255, 255)
 HIGHLIGHT_COLOR = (88, 101, 242)
 
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Paint (H)it")
+# Render scale ('render_scale' in config.json, or --render-scale): gameplay is drawn on a canvas
+# of this many pixels per game unit, so 0.5 fills a quarter of the pixels on a weak kiosk and 2
+# gives a 4K cabinet native-resolution art. Simulation and hit-testing stay in SCREEN_WIDTH x SCREEN_HEIGHT units.
+RENDER_SCALE_RANGE = (0.25, 4.0)
+GUN_SIZE = (200, 200)
+
+# Set up by init(); importing the module opens no window and loads nothing.
+# canvas_scale is the render scale in use; ui_surface is where the menus draw when it is not 1.
+screen = None
+canvas_scale = 1.0
+ui_surface = None
+startup_timings = OrderedDict()
+
+def to_canvas(value):
+    return round(value * canvas_scale)
+
+def mouse_pos():
+    # The display maps the mouse to canvas pixels; the game works in game units
+    x, y = pygame.mouse.get_pos()
+    return (int(x / canvas_scale), int(y / canvas_scale)) if canvas_scale != 1 else (x, y)
+
+# --- Fonts & Text Cache ---
+FONT_SIZE, FONT_SIZE_LARGE, FONT_SIZE_MEDIUM, FONT_SIZE_SMALL = 36, 72, 50, 24
+TEXT_CACHE_SIZE = 512
+
+font_cache = {}
+
+def get_font(size, name=None):
+    key = (name, size)
+    font_obj = font_cache.get(key)
+    if font_obj is None:
+        font_obj = font_cache[key] = pygame.font.Font(name, size)
+    return font_obj
+
+# LRU of rendered text keyed on (font, size, text, colour, antialias). The surfaces
+# are shared between callers, so they must only ever be blitted, never drawn on.
+class TextCache:
+    def __init__(self, max_entries=TEXT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.truncations = OrderedDict()
+
+    def render(self, name, size, text, color, antialias=True):
+        key = (name, size, text, tuple(color), antialias)
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            return surface
+        surface = self.entries[key] = get_font(size, name).render(text, antialias, color)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return surface
+
+    # Longest prefix of text that fits in max_width with "..." appended, found by binary search
+    def truncate(self, name, size, text, max_width):
+        key = (name, size, text, max_width)
+        result = self.truncations.get(key)
+        if result is not None:
+            self.truncations.move_to_end(key)
+            return result
+        font_obj = get_font(size, name)
+        if font_obj.size(text)[0] <= max_width:
+            result = text
+        else:
+            low, high = 0, len(text) - 1
+            while low < high:
+                mid = (low + high + 1) // 2
+                if font_obj.size(text[:mid] + "...")[0] <= max_width: low = mid
+                else: high = mid - 1
+            result = text[:low] + "..."
+        self.truncations[key] = result
+        if len(self.truncations) > self.max_entries:
+            self.truncations.popitem(last=False)
+        return result
+
+text_cache = TextCache()
+
+def render_text(text, color, size=FONT_SIZE, antialias=True):
+    return text_cache.render(None, size, text, color, antialias)
+
+def truncate_text(text, max_width, size=FONT_SIZE):
+    return text_cache.truncate(None, size, text, max_width)
+
+
+# --- Asset Cache ---
+def user_cache_dir(app_name='paint_hit'):
+    override = os.environ.get('PAINT_HIT_CACHE_DIR')
+    if override is not None:
+        return override or None
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~\\AppData\\Local')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, app_name)
 
-# --- Fonts ---
-font = pygame.font.Font(None, 36)
-font_large = pygame.font.Font(None, 72)
-font_medium = pygame.font.Font(None, 50)
-font_small = pygame.font.Font(None, 24)
+def scale_image(image, size):
+    if image.get_size() == size:
+        return image
+    try:
+        return pygame.transform.smoothscale(image, size)
+    except ValueError:  # smoothscale only handles 24 and 32 bit surfaces
+        return pygame.transform.scale(image, size)
+
+# Each entry is a small header plus the pixels from pygame.image.tobytes, keyed on the
+# source path, mtime, file size and target size, so a hit skips decoding and rescaling.
+# Surfaces come back unconverted; callers still convert() them for the display format.
+class AssetCache:
+    MAGIC = b'PHAC'
+    HEADER = struct.Struct('<4sII')
+
+    def __init__(self, directory, max_bytes=ASSET_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def entry_path(self, path, size, alpha):
+        st = os.stat(path)
+        key = f"{ASSET_CACHE_VERSION}|{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{size}|{alpha}"
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.raw')
+
+    # prepare(image, size) turns the decoded image into what gets cached, e.g. scale_image
+    def load(self, path, size=None, alpha=True, prepare=None):
+        pixel_format = 'RGBA' if alpha else 'RGB'
+        entry = None
+        if self.directory:
+            try:
+                entry = self.entry_path(path, size, alpha)
+            except OSError:
+                entry = None
+        if entry:
+            image = self.read(entry, pixel_format)
+            if image is not None:
+                self.hits += 1
+                return image
+        self.misses += 1
+        image = pygame.image.load(path)
+        if prepare is not None:
+            image = prepare(image, size)
+        if entry:
+            self.write(entry, image, pixel_format)
+        return image
+
+    def read(self, entry, pixel_format):
+        try:
+            with open(entry, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) < self.HEADER.size:
+            return None
+        magic, width, height = self.HEADER.unpack_from(data)
+        if magic != self.MAGIC or len(data) != self.HEADER.size + width * height * len(pixel_format):
+            return None
+        return pygame.image.frombuffer(data[self.HEADER.size:], (width, height), pixel_format)
+
+    def write(self, entry, image, pixel_format):
+        temp_path = f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                f.write(self.HEADER.pack(self.MAGIC, image.get_width(), image.get_height()))
+                f.write(pygame.image.tobytes(image, pixel_format))
+            os.replace(temp_path, entry)
+            self.prune()
+        except (OSError, pygame.error) as e:
+            print(f"Warning: could not write asset cache entry: {e}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def prune(self):
+        # Oldest entries go first once the cache outgrows max_bytes
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith('.raw'):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+asset_cache = AssetCache(user_cache_dir())
+
+# --- Background Image Loader ---
+# Decodes and downscales user-chosen images on a worker thread (through the asset cache)
+# so a huge photo never stalls a frame. convert() needs the display, so it runs on the
+# main thread in poll(), together with the callbacks. A newer request for the same key
+# supersedes an older one.
+class ImageLoader:
+    def __init__(self):
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.callbacks = {}
+        self.latest = {}
+        self.next_id = 0
+        self.thread = None
+
+    def load(self, key, path, size, prepare, alpha, on_done, on_error=None):
+        self.next_id += 1
+        self.latest[key] = self.next_id
+        self.callbacks[self.next_id] = (alpha, on_done, on_error)
+        self.requests.put((self.next_id, key, path, size, prepare, alpha))
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.work, name="image-loader", daemon=True)
+            self.thread.start()
+
+    def pending(self):
+        return bool(self.latest)
+
+    def work(self):
+        while True:
+            job_id, key, path, size, prepare, alpha = self.requests.get()
+            try:
+                self.results.put((job_id, key, asset_cache.load(path, size, alpha, prepare), None))
+            except Exception as e:
+                # Any failure (a bad file, or e.g. MemoryError on a huge photo) fails this load
+                # only; an ended thread would leave every later load pending for good
+                self.results.put((job_id, key, None, e))
+
+    def poll(self):
+        applied = 0
+        while True:
+            try:
+                job_id, key, image, error = self.results.get_nowait()
+            except queue.Empty:
+                return applied
+            alpha, on_done, on_error = self.callbacks.pop(job_id)
+            if self.latest.get(key) != job_id:
+                continue
+            del self.latest[key]
+            if error is None:
+                try:
+                    image = image.convert_alpha() if alpha else image.convert()
+                except pygame.error as e:
+                    error = e
+            if error is None:
+                on_done(image)
+                applied += 1
+            elif on_error is not None:
+                on_error(error)
+
+    def wait(self, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while self.pending() and time.monotonic() < deadline:
+            self.poll()
+            time.sleep(0.005)
+
+image_loader = ImageLoader()
+
+def max_face_size():
+    _, _, fw, fh = Target.FACE_BOX
+    scale = MAX_TARGET_SCALE * canvas_scale
+    return (int(silhouette_img.get_width() * scale * fw), int(silhouette_img.get_height() * scale * fh))
+
+def fit_face(image, max_size):
+    # Faces are always stretched into the face box, so shrinking each axis to the
+    # largest box a target can reach loses nothing
+    return scale_image(image, (min(image.get_width(), max_size[0]), min(image.get_height(), max_size[1])))
+
+def draw_loading_indicator(surface):
+    dots = "." * (pygame.time.get_ticks() // 300 % 4)
+    text_surface = render_text(f"Loading image{dots}", WHITE, FONT_SIZE_SMALL)
+    width, height = surface.get_size()
+    text_rect = text_surface.get_rect(bottomright=(width - 30, height - 20))
+    bg_rect = pygame.Rect(0, 0, render_text("Loading image...", WHITE, FONT_SIZE_SMALL).get_width() + 20, text_rect.height + 10)
+    bg_rect.bottomright = (width - 20, height - 15)
+    pygame.draw.rect(surface, (0, 0, 0), bg_rect, border_radius=8)
+    surface.blit(text_surface, (bg_rect.x + 10, bg_rect.y + 5))
+    return bg_rect
+
+# --- Background Persistence ---
+# Runs file and database writes on a worker thread. Each job has a key: submitting a key that
+# is still waiting replaces the waiting job and restarts its delay, so only the newest state
+# of a burst is written (merge=False queues the job on its own instead). flush() runs whatever
+# is waiting straight away and returns once done.
+class PersistenceWriter:
+    def __init__(self, delay=PERSIST_DELAY_SECONDS):
+        self.delay = delay
+        self.jobs = {}  # key -> (due time, name, fn)
+        self.next_id = 0
+        self.condition = threading.Condition()
+        self.busy = False
+        self.thread = None
+
+    def submit(self, name, fn, delay=None, merge=True):
+        with self.condition:
+            key = name
+            if not merge:
+                self.next_id += 1
+                key = (name, self.next_id)
+            self.jobs[key] = (time.monotonic() + (self.delay if delay is None else delay), name, fn)
+            self.condition.notify()
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.work, name="persistence-writer", daemon=True)
+            self.thread.start()
+
+    def work(self):
+        while True:
+            with self.condition:
+                while True:
+                    if self.jobs:
+                        key = min(self.jobs, key=lambda k: self.jobs[k][0])
+                        wait = self.jobs[key][0] - time.monotonic()
+                        if wait <= 0:
+                            break
+                        self.condition.wait(wait)
+                    else:
+                        self.condition.wait()
+                _, name, fn = self.jobs.pop(key)
+                self.busy = True
+            try:
+                fn()
+            except (OSError, sqlite3.Error) as e:
+                print(f"Could not save {name}: {e}")
+            except Exception as e:
+                # A bug in one job must not end the thread, or every later write would be lost
+                print(f"Could not save {name}: {type(e).__name__}: {e}")
+            finally:
+                with self.condition:
+                    self.busy = False
+                    self.condition.notify_all()
+
+    def pending(self):
+        with self.condition:
+            return bool(self.jobs) or self.busy
+
+    def flush(self, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            for key, (_, name, fn) in self.jobs.items():
+                self.jobs[key] = (0, name, fn)
+            self.condition.notify_all()
+            while (self.jobs or self.busy) and time.monotonic() < deadline:
+                self.condition.wait(deadline - time.monotonic())
+
+persistence = PersistenceWriter()
+
+def write_file_atomic(path, data):
+    # A crash mid-write leaves the old file in place rather than a truncated one.
+    # data is text, or bytes for binary files.
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb' if isinstance(data, bytes) else 'w') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
 
 # --- Asset Loading & Config Management ---
 custom_faces_paths = [None] * 4
 custom_background_path = None
 loaded_custom_faces = [None] * 4
 game_settings = {}
+background_img = None
 
 # --- Helper: File validation ---
 def is_valid_image(path):
     return path.lower().endswith((".png", ".jpg", ".jpeg"))
 
+def canvas_size():
+    return (to_canvas(SCREEN_WIDTH), to_canvas(SCREEN_HEIGHT))
+
 def load_default_background():
     global background_img
     try:
-        background_img = pygame.image.load('background.jpg').convert()
-    except pygame.error as e:
+        background_img = asset_cache.load('background.jpg', canvas_size(), False, scale_image).convert()
+    except (pygame.error, OSError) as e:
         print(f"Warning: Default background.jpg not found. Using a solid color. Error: {e}")
-        background_img = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        background_img = pygame.Surface(canvas_size())
         background_img.fill(BACKGROUND_COLOR)
-    background_img = pygame.transform.scale(background_img, (SCREEN_WIDTH, SCREEN_HEIGHT))
+    background_img = pygame.transform.scale(background_img, canvas_size())
+
+# Backgrounds load at canvas resolution for gameplay; the menus draw on a SCREEN_WIDTH x
+# SCREEN_HEIGHT surface, so they get a copy scaled down once per background
+ui_background_cache = (None, None)
+
+def ui_background():
+    global ui_background_cache
+    if canvas_scale == 1:
+        return background_img
+    source, scaled = ui_background_cache
+    if source is not background_img:
+        scaled = pygame.transform.smoothscale(background_img, (SCREEN_WIDTH, SCREEN_HEIGHT))
+        ui_background_cache = (background_img, scaled)
+    return scaled
 
 def load_config():
     global custom_background_path, custom_faces_paths, loaded_custom_faces, game_settings
@@ -79,119 +549,859 @@ def load_config():
         saved_paths = []
         game_settings = {}
 
-    # Attempt to load assets from the paths
+    # Saved images are decoded in the background; the default background shows until then
+    load_default_background()
     if custom_background_path and os.path.exists(custom_background_path):
-        try:
-            new_bg = pygame.image.load(custom_background_path).convert()
-            global background_img
-            background_img = pygame.transform.scale(new_bg, (SCREEN_WIDTH, SCREEN_HEIGHT))
-        except pygame.error as e:
-            print(f"Error loading saved background: {e}")
-            load_default_background()
-    else:
-        load_default_background()
+        load_custom_background(custom_background_path)
 
     loaded_custom_faces = [None] * 4
     custom_faces_paths = [None] * 4
     for i, path in enumerate(saved_paths):
         if i < 4 and path and os.path.exists(path):
-            try:
-                face = pygame.image.load(path).convert_alpha()
-                loaded_custom_faces[i] = face
-                custom_faces_paths[i] = path
-            except pygame.error as e:
-                print(f"Error loading saved face from {path}: {e}")
+            load_custom_face(i, path)
+
+def load_custom_background(path, on_done=None, on_error=None):
+    def done(image):
+        global background_img, custom_background_path
+        background_img = image
+        custom_background_path = path
+        if on_done: on_done()
+    def failed(error):
+        print(f"Error loading background '{path}': {error}")
+        if on_error: on_error(error)
+    image_loader.load('background', path, canvas_size(), scale_image, False, done, failed)
+
+def load_custom_face(slot, path, on_done=None, on_error=None):
+    # The path is recorded straight away so a save while decoding keeps it
+    previous_path = custom_faces_paths[slot]
+    custom_faces_paths[slot] = path
+    def done(image):
+        loaded_custom_faces[slot] = image
+        if on_done: on_done()
+    def failed(error):
+        print(f"Error loading face from '{path}': {error}")
+        if custom_faces_paths[slot] == path: custom_faces_paths[slot] = previous_path
+        if on_error: on_error(error)
+    image_loader.load(('face', slot), path, max_face_size(), fit_face, True, done, failed)
 
 def save_config():
+    # Snapshotted now, serialized and written on the persistence thread
     config = {
         'background_path': custom_background_path,
         'faces_paths': [path for path in custom_faces_paths if path is not None],
-        'game_settings': game_settings
+        'game_settings': dict(game_settings)
     }
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(config, f, indent=4)
-
-load_config()
-
-try:
-    gun_img = pygame.image.load('gun.png').convert_alpha()
-    gun_img = pygame.transform.scale(gun_img, (200, 200))
-    silhouette_img = pygame.image.load('silhouette.png').convert_alpha()
-    target_img = pygame.image.load('target.jpg').convert_alpha()
-    question_mark_img = pygame.image.load('question_mark.png').convert_alpha()
+    persistence.submit('config', lambda: write_file_atomic(CONFIG_FILE, json.dumps(config, indent=4)))
+
+# Gameplay assets, set by load_assets(). Menu-only images load on first use.
+gun_img = silhouette_img = target_img = None
+splat_base_images = splat_atlas = None
+question_mark_img = None
+
+def get_question_mark_img():
+    global question_mark_img
+    if question_mark_img is None:
+        question_mark_img = asset_cache.load('question_mark.png', (100, 100), True, scale_image).convert_alpha()
+    return question_mark_img
+
+
+# --- Splat Atlas ---
+# Built once at load time so no splat is ever scaled or rotated while playing. Target decal
+# layers use the max_size variants; misses on the backdrop use variants sized for the canvas.
+class SplatAtlas:
+    def __init__(self, base_images, max_size, canvas_scale=1.0, rotation_steps=SPLAT_ROTATION_STEPS):
+        self.max_size = max(1, max_size)
+        self.rotation_steps = rotation_steps
+        # Downsample the full resolution sources once; they are not kept around
+        self.base_images = {
+            color: scale_image(image, (self.max_size, self.max_size))
+            for color, image in base_images.items()
+        }
+        self.variants = self.rotations(self.base_images)
+        if canvas_scale == 1:
+            self.canvas_variants = self.variants
+        else:
+            canvas_size = max(1, round(self.max_size * canvas_scale))
+            self.canvas_variants = self.rotations({color: scale_image(image, (canvas_size, canvas_size))
+                                                   for color, image in base_images.items()})
+
+    def rotations(self, images):
+        return {(color, bucket): pygame.transform.rotate(image, bucket * 360 / self.rotation_steps)
+                for color, image in images.items() for bucket in range(self.rotation_steps)}
+
+    def get(self, color, rotation_bucket):
+        return self.variants[(color, rotation_bucket % self.rotation_steps)]
+
+    def get_canvas(self, color, rotation_bucket):
+        return self.canvas_variants[(color, rotation_bucket % self.rotation_steps)]
+
+def load_assets():
+    global gun_img, silhouette_img, target_img, splat_base_images, splat_atlas
+    gun_img = asset_cache.load('gun.png', (to_canvas(GUN_SIZE[0]), to_canvas(GUN_SIZE[1])), True, scale_image).convert_alpha()
+    silhouette_img = asset_cache.load('silhouette.png').convert_alpha()
+    target_img = asset_cache.load('target.jpg').convert_alpha()
+    # Splats are only ever drawn at up to the atlas size (or its canvas size for misses on
+    # the backdrop, when larger), so that is all that gets cached
+    splat_size = int(silhouette_img.get_width() * 0.2 * SPLAT_LAYER_SCALE)
+    source_size = max(splat_size, to_canvas(splat_size))
+    splat_files = {RED: 'splat_red.png', GREEN: 'splat_green.png', BLUE: 'splat_blue.png', YELLOW: 'splat_yellow.png'}
     splat_base_images = {
-        RED: pygame.image.load('splat_red.png').convert_alpha(),
-        GREEN: pygame.image.load('splat_green.png').convert_alpha(),
-        BLUE: pygame.image.load('splat_blue.png').convert_alpha(),
-        YELLOW: pygame.image.load('splat_yellow.png').convert_alpha(),
+        color: asset_cache.load(path, (source_size, source_size), True, scale_image).convert_alpha()
+        for color, path in splat_files.items()
     }
-except pygame.error as e:
-    print(f"Fatal Error: Could not load image asset: {e}")
-    sys.exit()
+    splat_atlas = SplatAtlas(splat_base_images, splat_size, canvas_scale)
+    splat_base_images = splat_atlas.base_images
 
 
 # --- Utility Functions ---
-def load_high_scores():
+def load_high_scores(path=HIGHSCORE_FILE):
     try:
-        with open(HIGHSCORE_FILE, 'r') as f:
+        with open(path, 'r') as f:
             return json.load(f)
     except (FileNotFoundError, json.JSONDecodeError):
         return []
 
-def save_high_scores(scores):
-    with open(HIGHSCORE_FILE, 'w') as f:
-        json.dump(scores, f, indent=4)
-
 def check_for_high_score(score, scores):
-    return len(scores) < 10 or score > min(s['score'] for s in scores)
+    return len(scores) < LEADERBOARD_SIZE or score > min(s['score'] for s in scores)
+
+def today():
+    return time.strftime('%Y-%m-%d')
+
+# --- Leaderboard ---
+# Saved runs live in one SQLite table with no size cap. A board is a (mode, difficulty, duration)
+# triple, duration being the timed challenge length or 0 for Classic, and can be narrowed to one
+# day. Top-N reads walk the board indexes. Ranks come from a Fenwick tree of score counts per
+# board, stored in rank_tree and updated in the same transaction as the insert, so a rank is
+# about log2(RANK_TREE_SIZE) primary-key lookups however many runs are stored.
+class Leaderboard:
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            score INTEGER NOT NULL,
+            mode TEXT NOT NULL,
+            difficulty TEXT NOT NULL,
+            duration INTEGER NOT NULL,
+            day TEXT,
+            created REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS runs_board ON runs (mode, difficulty, duration, score DESC);
+        CREATE INDEX IF NOT EXISTS runs_daily ON runs (day, mode, difficulty, duration, score DESC);
+        CREATE TABLE IF NOT EXISTS rank_tree (
+            board TEXT NOT NULL,
+            node INTEGER NOT NULL,
+            runs INTEGER NOT NULL,
+            PRIMARY KEY (board, node)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path, legacy_path=None):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.connection = None
+        # Inserts run on the persistence thread and reads on the frame thread; the lock keeps
+        # them off the shared connection at the same time. version counts committed inserts.
+        self.lock = threading.RLock()
+        self.version = 0
+
+    def connect(self):
+        # Opened on first use, so importing or running headless never touches the disk
+        with self.lock:
+            if self.connection is None:
+                try:
+                    self.connection = self.open(self.path)
+                except sqlite3.Error as e:
+                    print(f"Could not open {self.path} ({e}); scores are kept for this session only.")
+                    self.connection = self.open(':memory:')
+            return self.connection
+
+    def open(self, path):
+        connection = sqlite3.connect(path, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode = WAL')
+        connection.execute('PRAGMA synchronous = NORMAL')
+        connection.executescript(self.SCHEMA)
+        # user_version 0 means a fresh database: bring over the old top 10 as Classic/Normal runs
+        if connection.execute('PRAGMA user_version').fetchone()[0] == 0:
+            with connection:
+                if self.legacy_path is not None:
+                    for entry in load_high_scores(self.legacy_path):
+                        if isinstance(entry, dict) and isinstance(entry.get('score'), int):
+                            self.insert(connection, str(entry.get('name', '')), entry['score'], ('PLAYING', 'Normal', 0), None)
+                connection.execute('PRAGMA user_version = 1')
+        return connection
+
+    @staticmethod
+    def board_key(board, day=None):
+        key = "/".join(str(part) for part in board)
+        return key if day is None else f"{key}/{day}"
+
+    def insert(self, connection, name, score, board, day):
+        connection.execute("INSERT INTO runs (name, score, mode, difficulty, duration, day, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                           (name, score, *board, day, time.time()))
+        self.count_run(connection, self.board_key(board), score)
+        if day is not None:
+            self.count_run(connection, self.board_key(board, day), score)
+
+    def add(self, name, score, board):
+        with self.lock:
+            connection = self.connect()
+            with connection:
+                self.insert(connection, name, score, board, today())
+            self.version += 1
+
+    def count_run(self, connection, key, score):
+        node = min(max(score, 0), RANK_TREE_SIZE - 1) + 1
+        nodes = []
+        while node <= RANK_TREE_SIZE:
+            nodes.append((key, node))
+            node += node & -node
+        connection.executemany("INSERT INTO rank_tree (board, node, runs) VALUES (?, ?, 1) "
+                               "ON CONFLICT (board, node) DO UPDATE SET runs = runs + 1", nodes)
+
+    def runs_at_most(self, connection, key, score):
+        node = min(max(score, 0), RANK_TREE_SIZE - 1) + 1
+        nodes = []
+        while node > 0:
+            nodes.append(node)
+            node -= node & -node
+        placeholders = ", ".join("?" * len(nodes))
+        row = connection.execute(f"SELECT SUM(runs) FROM rank_tree WHERE board = ? AND node IN ({placeholders})",
+                                 (key, *nodes)).fetchone()
+        return row[0] or 0
+
+    # Returns (rank, runs): where a score places among the board's stored runs, ties sharing the
+    # better rank, and how many runs the board holds
+    def rank(self, score, board, day=None):
+        with self.lock:
+            connection = self.connect()
+            key = self.board_key(board, day)
+            runs = self.runs_at_most(connection, key, RANK_TREE_SIZE - 1)
+            return runs - self.runs_at_most(connection, key, score) + 1, runs
+
+    def top(self, board, day=None, limit=LEADERBOARD_SIZE):
+        with self.lock:
+            if day is None:
+                rows = self.connect().execute("SELECT name, score FROM runs WHERE mode = ? AND difficulty = ? AND duration = ? "
+                                              "ORDER BY score DESC, id LIMIT ?", (*board, limit))
+            else:
+                rows = self.connect().execute("SELECT name, score FROM runs WHERE day = ? AND mode = ? AND difficulty = ? "
+                                              "AND duration = ? ORDER BY score DESC, id LIMIT ?", (day, *board, limit))
+            return [{'name': name, 'score': score} for name, score in rows]
+
+    def qualifies(self, score, board):
+        # A run can be saved if it makes the board's all-time or today's top LEADERBOARD_SIZE
+        return any(check_for_high_score(score, self.top(board, day)) for day in (None, today()))
+
+# --- Target Image Cache ---
+# Pre-composited silhouette + target + face surfaces, keyed on (face, quantized scale).
+# Surfaces are built at canvas resolution, and the byte budget grows with the canvas.
+class TargetImageCache:
+    def __init__(self, max_bytes=TARGET_CACHE_MAX_BYTES, scale_step=TARGET_SCALE_STEP):
+        self.max_bytes = max_bytes
+        self.scale_step = scale_step
+        self.entries = OrderedDict()
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def quantize(self, scale):
+        return max(1, round(scale / self.scale_step))
+
+    def get(self, base_silhouette_img, base_target_img, face_img, step):
+        key = (base_silhouette_img, base_target_img, face_img, step)
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = self.build(base_silhouette_img, base_target_img, face_img, step * self.scale_step * canvas_scale)
+        if surface is None:
+            return None
+        self.entries[key] = surface
+        self.used_bytes += self.surface_bytes(surface)
+        while self.used_bytes > self.max_bytes * canvas_scale ** 2 and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.used_bytes -= self.surface_bytes(evicted)
+        return surface
+
+    def clear(self):
+        self.entries.clear()
+        self.used_bytes = 0
+
+    @staticmethod
+    def surface_bytes(surface):
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    @staticmethod
+    def build(base_silhouette_img, base_target_img, face_img, scale):
+        width = int(base_silhouette_img.get_width() * scale)
+        height = int(base_silhouette_img.get_height() * scale)
+        if width < 1 or height < 1: return None
+        image = pygame.transform.scale(base_silhouette_img, (width, height))
+        tgt_size = int(width * 0.5)
+        if tgt_size > 0:
+            scaled_target = pygame.transform.scale(base_target_img, (tgt_size, tgt_size))
+            image.blit(scaled_target, (int(width * 0.25), int(height * 0.3)))
+        if face_img:
+            fx, fy, fw, fh = Target.FACE_BOX
+            face_w, face_h = int(width * fw), int(height * fh)
+            if face_w > 0 and face_h > 0:
+                scaled_face = pygame.transform.scale(face_img, (face_w, face_h))
+                image.blit(scaled_face, (int(width * fx), int(height * fy)))
+        return image
+
+target_image_cache = TargetImageCache()
+
+# --- Directory Model ---
+# scandir-based listings for the file explorer: entries are (name, is_dir), directories first.
+# A path is listed once and re-read only when its mtime changes (checked at most once a second).
+class DirectoryModel:
+    BACK_ENTRY = (".. (Back)", True)
+
+    def __init__(self, recheck_interval=DIRECTORY_RECHECK_SECONDS, max_paths=DIRECTORY_CACHE_SIZE):
+        self.recheck_interval = recheck_interval
+        self.max_paths = max_paths
+        self.listings = OrderedDict()  # path -> [mtime_ns, checked_at, entries, error]
+
+    def listing(self, path):
+        now = time.monotonic()
+        cached = self.listings.get(path)
+        if cached is not None:
+            self.listings.move_to_end(path)
+            if now - cached[1] < self.recheck_interval:
+                return cached
+            cached[1] = now
+            if self.stat_mtime(path) == cached[0]:
+                return cached
+        cached = self.read(path, now)
+        self.listings[path] = cached
+        while len(self.listings) > self.max_paths:
+            self.listings.popitem(last=False)
+        return cached
+
+    def entries(self, path):
+        return self.listing(path)[2]
+
+    def error(self, path):
+        return self.listing(path)[3]
+
+    def invalidate(self, path=None):
+        if path is None: self.listings.clear()
+        else: self.listings.pop(path, None)
+
+    @staticmethod
+    def stat_mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def read(self, path, now):
+        mtime = self.stat_mtime(path)
+        entries = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    # is_dir() uses the d_type from the directory entry where the OS provides it
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    entries.append((entry.name, is_dir))
+        except OSError as e:
+            return [mtime, now, [], e]
+        entries.sort(key=lambda e: e[1], reverse=True)
+        if path != os.path.abspath(os.sep):
+            entries.insert(0, self.BACK_ENTRY)
+        return [mtime, now, entries, None]
+
+directory_model = DirectoryModel()
+
+# --- Input Sources ---
+class LiveInput:
+    MOUSE_EVENTS = (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION)
+
+    def get_events(self):
+        events = pygame.event.get()
+        if canvas_scale != 1:
+            # Mouse events arrive in canvas pixels; handlers work in game units
+            for event in events:
+                if event.type in self.MOUSE_EVENTS:
+                    event.pos = (int(event.pos[0] / canvas_scale), int(event.pos[1] / canvas_scale))
+        return events
+
+    def get_pos(self):
+        return mouse_pos()
+
+# Posted to handle_gameplay when the spawn cap changes; the quality governor's last level
+# caps live targets, which changes the game, so replays carry it as an input event.
+SPAWN_CAP_EVENT = pygame.event.custom_type()
+
+# Replays a script of (frame, kind, *args) entries, one get_events() call per frame.
+# Kinds: 'move' x y, 'click' x y [button], 'key' name (a pygame key name such as 'p' or '1', or a key code),
+# 'spawn_cap' n (0 lifts the cap).
+class ScriptedInput:
+    def __init__(self, script=(), start_pos=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)):
+        self.frames = {}
+        for frame, kind, *args in script:
+            self.frames.setdefault(int(frame), []).append((kind, args))
+        self.frame = 0
+        self.pos = start_pos
+
+    def get_events(self):
+        events = [self.make_event(kind, args) for kind, args in self.frames.get(self.frame, ())]
+        self.frame += 1
+        return events
+
+    def get_pos(self):
+        return self.pos
+
+    def make_event(self, kind, args):
+        if kind == 'move':
+            self.pos = (int(args[0]), int(args[1]))
+            return pygame.event.Event(pygame.MOUSEMOTION, pos=self.pos, rel=(0, 0), buttons=(0, 0, 0))
+        if kind == 'click':
+            self.pos = (int(args[0]), int(args[1]))
+            button = int(args[2]) if len(args) > 2 else 1
+            return pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=self.pos, button=button)
+        if kind == 'key':
+            if isinstance(args[0], int):
+                return pygame.event.Event(pygame.KEYDOWN, key=args[0], mod=0, unicode="")
+            name = str(args[0])
+            return pygame.event.Event(pygame.KEYDOWN, key=pygame.key.key_code(name), mod=0,
+                                      unicode=name if len(name) == 1 else "")
+        if kind == 'spawn_cap':
+            return pygame.event.Event(SPAWN_CAP_EVENT, cap=int(args[0]) or None)
+        raise ValueError(f"Unknown scripted input kind: {kind}")
+
+# --- Input Recording ---
+# A replay log holds everything a gameplay session depends on: the RNG seed, the settings,
+# and each input event keyed on the update tick it was handled before (paused ticks count).
+# Replaying it through a HeadlessEngine must end on the recorded score, lives and combo.
+class ReplayLog:
+    MODES = ('PLAYING', 'TIMED_CHALLENGE')
+    SPEEDS = ('Easy', 'Normal', 'Hard')
+    KINDS = ('move', 'click', 'key', 'spawn_cap')
+    # Only the keys handle_gameplay reacts to are recorded, stored as an index into this tuple
+    KEYS = (pygame.K_1, pygame.K_2, pygame.K_3, pygame.K_4, pygame.K_p, pygame.K_r, pygame.K_q, pygame.K_y, pygame.K_n)
+
+    def __init__(self, seed=0, mode='PLAYING', speed_setting='Normal', challenge_duration=60, swarm_size=0, faces=()):
+        self.seed = seed
+        self.mode = mode
+        self.speed_setting = speed_setting
+        self.challenge_duration = challenge_duration
+        self.swarm_size = swarm_size
+        self.faces = list(faces)  # Paths of the faces in play; only their count affects the simulation
+        self.events = []  # (frame, kind index, a, b)
+        self.frames = 0
+        self.score = 0
+        self.lives = 0
+        self.combo_counter = 0
 
-def add_high_score(name, score, scores):
-    scores.append({'name': name, 'score': score})
-    scores.sort(key=lambda s: s['score'], reverse=True)
-    return scores[:10]
+    def script(self):
+        script = []
+        for frame, kind, a, b in self.events:
+            if self.KINDS[kind] == 'key':
+                script.append((frame, 'key', self.KEYS[a]))
+            else:
+                script.append((frame, self.KINDS[kind], a, b))
+        return script
+
+    def to_bytes(self):
+        faces = [(path or "").encode('utf-8') for path in self.faces]
+        parts = [REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed, self.MODES.index(self.mode),
+                                    self.SPEEDS.index(self.speed_setting), self.challenge_duration, self.swarm_size,
+                                    self.score, self.lives, self.combo_counter, self.frames, len(self.events), len(faces))]
+        for face in faces:
+            parts.append(struct.pack('<H', len(face)) + face)
+        parts.extend(REPLAY_EVENT.pack(*event) for event in self.events)
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < REPLAY_HEADER.size:
+            raise ValueError("Replay log is truncated")
+        (magic, version, seed, mode, speed, duration, swarm_size, score, lives, combo,
+         frames, event_count, face_count) = REPLAY_HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC or version not in (1, REPLAY_VERSION):
+            raise ValueError("Not a Paint (H)it replay log, or one from another version")
+        log = cls(seed, cls.MODES[mode], cls.SPEEDS[speed], duration, swarm_size)
+        log.score, log.lives, log.combo_counter, log.frames = score, lives, combo, frames
+        offset = REPLAY_HEADER.size
+        try:
+            for _ in range(face_count):
+                (length,) = struct.unpack_from('<H', data, offset)
+                log.faces.append(data[offset + 2:offset + 2 + length].decode('utf-8') or None)
+                offset += 2 + length
+            log.events = list(REPLAY_EVENT.iter_unpack(data[offset:offset + event_count * REPLAY_EVENT.size]))
+        except struct.error as e:
+            raise ValueError(f"Replay log is truncated: {e}")
+        if len(log.events) != event_count:
+            raise ValueError("Replay log is truncated")
+        return log
+
+    def save(self, path):
+        write_file_atomic(path, self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+# Records a Game's gameplay sessions. start() begins a new log (a restart drops the
+# unfinished one); finish() stamps the final state and writes it into the directory.
+class InputRecorder:
+    def __init__(self, directory):
+        self.directory = directory
+        self.log = None
+        self.last_pos = None
+
+    @property
+    def active(self):
+        return self.log is not None
+
+    def start(self, game, seed):
+        if game.faces is not None:
+            faces, paths = game.faces, [None] * len(game.faces)
+        else:
+            faces, paths = loaded_custom_faces, custom_faces_paths
+        self.log = ReplayLog(seed, game.state, game.speed_setting, game.challenge_duration, game.swarm_size,
+                             [path for path, face in zip(paths, faces) if face is not None])
+        self.last_pos = None
+        if game.spawn_cap is not None:
+            self.log.events.append((0, 3, game.spawn_cap, 0))
+
+    def record_pos(self, frame, pos):
+        # Mouse position only moves the gun, so it is logged when it changes rather than every frame
+        if self.log is not None and pos != self.last_pos:
+            self.last_pos = pos
+            self.log.events.append((frame, 0, pos[0], pos[1]))
+
+    def record(self, frame, event):
+        if self.log is None:
+            return
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            self.log.events.append((frame, 1, event.pos[0], event.pos[1]))
+        elif event.type == pygame.KEYDOWN and event.key in ReplayLog.KEYS:
+            self.log.events.append((frame, 2, ReplayLog.KEYS.index(event.key), 0))
+        elif event.type == SPAWN_CAP_EVENT:
+            self.log.events.append((frame, 3, event.cap or 0, 0))
+
+    def finish(self, game):
+        log, self.log = self.log, None
+        log.frames = game.input_frame
+        log.score, log.lives, log.combo_counter = game.score, game.lives, game.combo_counter
+        os.makedirs(self.directory, exist_ok=True)
+        # Games can end within the same second, so later ones get a counter suffix
+        stamp = time.strftime("paint_hit_%Y%m%d_%H%M%S")
+        path = os.path.join(self.directory, stamp + ".phr")
+        copy = 1
+        while os.path.exists(path):
+            copy += 1
+            path = os.path.join(self.directory, f"{stamp}_{copy}.phr")
+        log.save(path)
+        return path
+
+# --- Frame Profiler ---
+# Linear-interpolated percentile of an already sorted list; shared with benchmark.py and batch_sim.py
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    index = (len(sorted_samples) - 1) * pct / 100
+    low = int(index)
+    high = min(low + 1, len(sorted_samples) - 1)
+    return sorted_samples[low] + (sorted_samples[high] - sorted_samples[low]) * (index - low)
+
+# Records per-phase durations for every frame into a fixed-size ring buffer.
+# Surface allocations are counted while enabled by wrapping pygame.Surface and
+# pygame.transform, so they cover our own allocations but not font rendering.
+class FrameProfiler:
+    COUNTED_TRANSFORMS = ('scale', 'smoothscale', 'rotate', 'rotozoom', 'flip')
+
+    def __init__(self, size=PROFILE_BUFFER_FRAMES):
+        self.size = size
+        self.frames = [None] * size
+        self.count = 0
+        self.enabled = False
+        self.surface_allocations = 0
+        self.original_surface = pygame.Surface
+        self.original_transforms = {}
+        self.overlay = None
+        self.frame_start = self.last_mark = 0.0
+        self.phase_times = dict.fromkeys(PROFILE_PHASES, 0.0)
+
+    def toggle(self):
+        self.set_enabled(not self.enabled)
+
+    def set_enabled(self, enabled):
+        if enabled == self.enabled:
+            return
+        self.enabled = enabled
+        if enabled:
+            # F3 arrives after begin_frame() skipped this frame, so start timing it from here
+            self.frame_start = self.last_mark = time.perf_counter()
+            self.surface_allocations = 0
+            for phase in self.phase_times:
+                self.phase_times[phase] = 0.0
+            self.install_counters()
+        else:
+            self.remove_counters()
+            self.overlay = None
+
+    def install_counters(self):
+        profiler = self
+
+        class CountingSurface(self.original_surface):
+            def __init__(self, *args, **kwargs):
+                profiler.surface_allocations += 1
+                super().__init__(*args, **kwargs)
+
+        def counted(fn):
+            def wrapper(*args, **kwargs):
+                profiler.surface_allocations += 1
+                return fn(*args, **kwargs)
+            return wrapper
+
+        pygame.Surface = CountingSurface
+        for name in self.COUNTED_TRANSFORMS:
+            self.original_transforms[name] = getattr(pygame.transform, name)
+            setattr(pygame.transform, name, counted(self.original_transforms[name]))
+
+    def remove_counters(self):
+        pygame.Surface = self.original_surface
+        for name, fn in self.original_transforms.items():
+            setattr(pygame.transform, name, fn)
+        self.original_transforms = {}
+
+    def begin_frame(self):
+        if not self.enabled: return
+        self.frame_start = self.last_mark = time.perf_counter()
+        self.surface_allocations = 0
+        for phase in self.phase_times:
+            self.phase_times[phase] = 0.0
+
+    def mark(self, phase):
+        if not self.enabled: return
+        now = time.perf_counter()
+        self.phase_times[phase] += (now - self.last_mark) * 1000
+        self.last_mark = now
+
+    def end_frame(self, target_count, splat_count, quality_level=0):
+        if not self.enabled: return
+        total_ms = (time.perf_counter() - self.frame_start) * 1000
+        record = ((self.count, total_ms) + tuple(self.phase_times[p] for p in PROFILE_PHASES)
+                  + (target_count, splat_count, self.surface_allocations, quality_level))
+        self.frames[self.count % self.size] = record
+        self.count += 1
+
+    def records(self):
+        if self.count <= self.size:
+            return self.frames[:self.count]
+        start = self.count % self.size
+        return self.frames[start:] + self.frames[:start]
+
+    def summary(self):
+        records = self.records()
+        if not records:
+            return None
+        totals = sorted(r[1] for r in records)
+        mean_total = sum(totals) / len(totals)
+        phase_means = {phase: sum(r[2 + i] for r in records) / len(records) for i, phase in enumerate(PROFILE_PHASES)}
+        # The tick phase is time spent waiting for the frame cap, so it never counts as the worst
+        worst = max((p for p in PROFILE_PHASES if p != 'tick'), key=phase_means.get)
+        return {
+            'frames': len(records),
+            'fps': 1000 / mean_total if mean_total else 0,
+            'p50_ms': totals[len(totals) // 2],
+            'p99_ms': totals[min(len(totals) - 1, int(len(totals) * 0.99))],
+            'worst_phase': worst,
+            'worst_phase_ms': phase_means[worst],
+            'phase_means_ms': phase_means,
+        }
+
+    def draw_overlay(self, surface):
+        if not self.enabled: return
+        # Re-render the text a few times per second rather than every frame
+        if self.overlay is None or self.count % 15 == 0:
+            stats = self.summary()
+            if stats is None: return
+            last = self.frames[(self.count - 1) % self.size]
+            lines = [
+                f"FPS {stats['fps']:.0f}  p50 {stats['p50_ms']:.1f}ms  p99 {stats['p99_ms']:.1f}ms",
+                f"worst: {stats['worst_phase']} {stats['worst_phase_ms']:.2f}ms",
+                f"targets {last[-4]}  splats {last[-3]}  allocs {last[-2]}",
+                f"quality {last[-1]} ({QUALITY_LEVELS[last[-1]][0]})",
+            ]
+            rendered = [get_font(FONT_SIZE_SMALL).render(line, True, WHITE) for line in lines]
+            width = max(r.get_width() for r in rendered) + 16
+            height = sum(r.get_height() for r in rendered) + 12
+            self.overlay = self.original_surface((width, height), pygame.SRCALPHA)
+            self.overlay.fill((0, 0, 0, 180))
+            y = 6
+            for r in rendered:
+                self.overlay.blit(r, (8, y))
+                y += r.get_height()
+        return surface.blit(self.overlay, (10, surface.get_height() - self.overlay.get_height() - 10))
+
+    def dump(self, basename=None):
+        basename = basename or time.strftime("paint_hit_profile_%Y%m%d_%H%M%S")
+        columns = ['frame', 'total_ms'] + [f"{p}_ms" for p in PROFILE_PHASES] + ['targets', 'splats', 'surface_allocs', 'quality_level']
+        records = self.records()
+        with open(basename + '.csv', 'w') as f:
+            f.write(",".join(columns) + "\n")
+            for record in records:
+                f.write(",".join(f"{v:.4f}" if isinstance(v, float) else str(v) for v in record) + "\n")
+        with open(basename + '.json', 'w') as f:
+            json.dump({'summary': self.summary(), 'columns': columns, 'frames': records}, f, indent=4)
+        return basename
+
+# --- Quality Governor ---
+# Trades visual detail for frame rate. Each level adds one saving on top of the previous
+# ones (see QUALITY_LEVELS): coarser target image steps, rarer splat re-composites, a lean
+# HUD, then a cap on live targets. The window restarts after every change, so each decision
+# sees a full window of frames rendered at the current level.
+class QualityGovernor:
+    def __init__(self, max_fps, window=QUALITY_WINDOW_FRAMES):
+        self.budget_ms = 1000 / (max_fps or SIM_HZ)
+        self.samples = deque(maxlen=window)
+        self.level = 0
+        self.raise_hold = 0
+
+    @property
+    def name(self):
+        return QUALITY_LEVELS[self.level][0]
+
+    def record(self, work_ms):
+        # Returns True when the level changed
+        self.samples.append(work_ms)
+        self.raise_hold = max(0, self.raise_hold - 1)
+        if len(self.samples) < self.samples.maxlen:
+            return False
+        ordered = sorted(self.samples)
+        p90 = ordered[int(len(ordered) * 0.9)]
+        if p90 > self.budget_ms * QUALITY_LOWER_FRACTION and self.level < len(QUALITY_LEVELS) - 1:
+            self.level += 1
+            self.raise_hold = QUALITY_RAISE_HOLD_FRAMES
+        elif p90 < self.budget_ms * QUALITY_RAISE_FRACTION and self.level > 0 and not self.raise_hold:
+            self.level -= 1
+        else:
+            return False
+        self.samples.clear()
+        return True
 
 # --- Game Classes ---
 class Player(pygame.sprite.Sprite):
+    BOUNDS = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+
     def __init__(self, image):
         super().__init__()
-        self.image = image
-        self.rect = self.image.get_rect(centerx=SCREEN_WIDTH / 2, bottom=SCREEN_HEIGHT)
-
-    def update(self):
-        self.rect.centerx = pygame.mouse.get_pos()[0]
-        self.rect.clamp_ip(screen.get_rect())
+        self.image = image  # At canvas resolution; the rect is in game units
+        self.rect = pygame.Rect((0, 0), GUN_SIZE)
+        self.rect.midbottom = (SCREEN_WIDTH / 2, SCREEN_HEIGHT)
+
+    def update(self, mouse_x):
+        self.rect.centerx = mouse_x
+        self.rect.clamp_ip(self.BOUNDS)
+
+# --- Object Pools ---
+# Free lists of retired objects: acquire() recycles one through its reset() method or
+# builds a new one, so steady-state play stops allocating Targets and Splats.
+class ObjectPool:
+    def __init__(self, factory, max_free=16):
+        self.factory = factory
+        self.max_free = max_free
+        self.free = []
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, *args):
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args)
+            self.reused += 1
+            return obj
+        self.created += 1
+        return self.factory(*args)
+
+    def release(self, obj):
+        if len(self.free) < self.max_free:
+            self.free.append(obj)
 
 class Splat:
-    def __init__(self, norm_pos, color):
+    __slots__ = ('norm_pos', 'rotation', 'image')
+
+    def __init__(self, norm_pos, color, rng=random):
+        self.reset(norm_pos, color, rng)
+
+    def reset(self, norm_pos, color, rng=random):
         self.norm_pos = norm_pos
-        self.base_image = splat_base_images[color]
-        self.rotation = random.randint(0, 360)
+        self.rotation = rng.randrange(splat_atlas.rotation_steps)
+        self.image = splat_atlas.get(color, self.rotation)
+
+splat_pool = ObjectPool(Splat)
 
+# Pooled through Game.target_pool. Sprite itself has no __slots__, so instances keep a
+# __dict__ (holding only the Sprite's group set); the per-target state lives in the slots.
 class Target(pygame.sprite.Sprite):
     LANES = [200, 400, 600, 800]
-
-    def __init__(self, base_silhouette_img, base_target_img, face_img, speed_multiplier):
+    FACE_BOX = (0.35, 0.05, 0.30, 0.20)
+    # False skips all pixel work (images stay None, splats are counted but not baked) while
+    # geometry and RNG draws stay exactly the same; for batch runs that never draw
+    compose_images = True
+    # Set by the quality governor: images are composited every this many scale steps, so a
+    # growing target re-composites less often. Geometry always follows the fine step.
+    image_stride = 1
+    splat_image_stride = 1
+    __slots__ = ('rng', 'on_escape', 'base_silhouette_img', 'base_target_img', 'face_img', 'splat_layer', 'splat_count',
+                 'x', 'y', 'target_lane_x', 'scale', 'speed', 'falling', 'fall_speed', 'lane_change_timer', 'face_box',
+                 'image_step', 'image_splats', 'render_scale', 'prev_centerx', 'prev_centery', 'image', 'rect',
+                 'face_abs_rect', 'target_center_x', 'target_center_y', 'target_radius', 'red_circle_abs_rect',
+                 'target_center_rect_on_image', 'depth_seq')
+
+    def __init__(self, base_silhouette_img, base_target_img, face_img, speed_multiplier, rng=random, on_escape=None):
         super().__init__()
+        self.splat_layer = None
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.face_abs_rect = pygame.Rect(0, 0, 0, 0)
+        self.red_circle_abs_rect = pygame.Rect(0, 0, 0, 0)
+        self.reset(base_silhouette_img, base_target_img, face_img, speed_multiplier, rng, on_escape)
+
+    def reset(self, base_silhouette_img, base_target_img, face_img, speed_multiplier, rng=random, on_escape=None):
+        # Sets every per-life field, so a pooled target comes back as good as new. The
+        # decal layer surface is kept and cleared when the silhouette size still matches.
+        self.rng = rng
+        self.on_escape = on_escape
+        if self.splat_layer is not None:
+            if base_silhouette_img is not self.base_silhouette_img:
+                self.splat_layer = None
+            elif self.splat_count:
+                self.splat_layer.fill((0, 0, 0, 0))
         self.base_silhouette_img = base_silhouette_img
         self.base_target_img = base_target_img
         self.face_img = face_img
-        self.splats = []
+        self.splat_count = 0
         self.y = 60
-        self.x = random.choice(self.LANES)
+        self.x = rng.choice(self.LANES)
         self.target_lane_x = self.x
         self.scale = 0.10
-        self.speed = random.uniform(0.5, 1.2) * speed_multiplier
+        self.speed = rng.uniform(0.5, 1.2) * speed_multiplier
         self.falling, self.fall_speed = False, 0
-        self.lane_change_timer = random.randint(120, 240)
-        self.face_box = (0.35, 0.05, 0.30, 0.20)
+        self.lane_change_timer = rng.randint(120, 240)
+        self.face_box = self.FACE_BOX
+        self.image_step = None
+        self.image_splats = 0
+        self.render_scale = self.scale
         self.update_image()
+        self.prev_centerx = self.rect.centerx
+        self.prev_centery = self.rect.centery
         self.target_center_rect_on_image = None
         
     def is_face_hit(self, pos):
         return self.face_abs_rect.collidepoint(pos)
 
     def score_body(self, pos):
-        distance = math.hypot(pos[0] - self.target_center_abs[0], pos[1] - self.target_center_abs[1])
+        distance = math.hypot(pos[0] - self.target_center_x, pos[1] - self.target_center_y)
         if distance <= self.target_radius * 0.2:
             return 10
         if distance <= self.target_radius:
@@ -201,67 +1411,91 @@ class Target(pygame.sprite.Sprite):
         return 0
 
     def add_splat(self, hit_pos, color):
-        norm_x = (hit_pos[0] - self.rect.left) / self.scale
-        norm_y = (hit_pos[1] - self.rect.top) / self.scale
-        self.splats.append(Splat((norm_x, norm_y), color))
+        norm_x = (hit_pos[0] - self.rect.left) / self.render_scale
+        norm_y = (hit_pos[1] - self.rect.top) / self.render_scale
+        splat = splat_pool.acquire((norm_x, norm_y), color, self.rng)
+        self.bake_splat(splat)
+        splat_pool.release(splat)
+
+    def bake_splat(self, splat):
+        # Composite the splat once into the decal layer; the layer is in the
+        # same normalized coordinates as add_splat, shrunk by SPLAT_LAYER_SCALE.
+        self.splat_count += 1
+        if not self.compose_images:
+            return
+        if self.splat_layer is None:
+            layer_w = max(1, int(self.base_silhouette_img.get_width() * SPLAT_LAYER_SCALE))
+            layer_h = max(1, int(self.base_silhouette_img.get_height() * SPLAT_LAYER_SCALE))
+            self.splat_layer = pygame.Surface((layer_w, layer_h), pygame.SRCALPHA)
+        center = (splat.norm_pos[0] * SPLAT_LAYER_SCALE, splat.norm_pos[1] * SPLAT_LAYER_SCALE)
+        self.splat_layer.blit(splat.image, splat.image.get_rect(center=center))
 
     def update_image(self):
-        width = int(self.base_silhouette_img.get_width() * self.scale)
-        height = int(self.base_silhouette_img.get_height() * self.scale)
+        step = target_image_cache.quantize(self.scale)
+        render_scale = step * target_image_cache.scale_step
+        width = int(self.base_silhouette_img.get_width() * render_scale)
+        height = int(self.base_silhouette_img.get_height() * render_scale)
         if width < 1 or height < 1: return
-        self.image = pygame.transform.scale(self.base_silhouette_img, (width, height))
         tgt_size = int(width * 0.5)
-        scaled_target = pygame.transform.scale(self.base_target_img, (tgt_size, tgt_size))
-        self.target_pos_on_image = (int(width * 0.25), int(height * 0.3))
-        self.image.blit(scaled_target, self.target_pos_on_image)
-        if self.face_img:
-            fx, fy, fw, fh = self.face_box
-            face_w, face_h = int(width * fw), int(height * fh)
-            if face_w > 0 and face_h > 0:
-                scaled_face = pygame.transform.scale(self.face_img, (face_w, face_h))
-                self.image.blit(scaled_face, (int(width * fx), int(height * fy)))
-
-        for splat in self.splats:
-            base_w = int(self.base_silhouette_img.get_width() * 0.2)
-            cur_w = int(base_w * self.scale)
-            if cur_w < 1: continue
-            scaled_splat = pygame.transform.scale(splat.base_image, (cur_w, cur_w))
-            rotated_splat = pygame.transform.rotate(scaled_splat, splat.rotation)
-            cx = splat.norm_pos[0] * self.scale
-            cy = splat.norm_pos[1] * self.scale
-            srect = rotated_splat.get_rect(center=(cx, cy))
-            self.image.blit(rotated_splat, srect)
-
-        self.rect = self.image.get_rect(center=(self.x, self.y))
+
+        self.render_scale = render_scale
+        stride = self.splat_image_stride if self.splat_count else self.image_stride
+        image_step = max(1, step - step % stride)
+
+        # Only re-composite when the image's scale bucket or the splat count changed;
+        # otherwise (e.g. falling targets) the previous image is reused as is.
+        if image_step != self.image_step or self.splat_count != self.image_splats:
+            self.image_step = image_step
+            self.image_splats = self.splat_count
+            if not self.compose_images:
+                self.image = None
+            elif self.splat_count == 0:
+                self.image = target_image_cache.get(self.base_silhouette_img, self.base_target_img, self.face_img, image_step)
+            else:
+                # Cached composites are shared, so the decal layer goes onto a copy
+                self.image = target_image_cache.get(self.base_silhouette_img, self.base_target_img, self.face_img, image_step).copy()
+                self.image.blit(pygame.transform.scale(self.splat_layer, self.image.get_size()), (0, 0))
+
+        # Everything below updates the existing rects and numbers in place; this runs
+        # for every target on every tick
+        rect = self.rect
+        rect.width = width
+        rect.height = height
+        rect.centerx = self.x
+        rect.centery = self.y
         fx, fy, fw, fh = self.face_box
-        face_rect_on_image = pygame.Rect(int(width * fx), int(height * fy), int(width * fw), int(height * fh))
-        if self.rect.top + face_rect_on_image.top < 0:
-            self.y -= (self.rect.top + face_rect_on_image.top)
-            self.rect = self.image.get_rect(center=(self.x, self.y))
-        self.face_abs_rect = pygame.Rect(self.rect.left + face_rect_on_image.left, self.rect.top + face_rect_on_image.top, face_rect_on_image.width, face_rect_on_image.height)
-        self.target_center_abs = (self.rect.left + self.target_pos_on_image[0] + tgt_size / 2, self.rect.top + self.target_pos_on_image[1] + tgt_size / 2)
-        self.target_radius = tgt_size / 2
-        self.red_circle_abs_rect = pygame.Rect(
-            self.target_center_abs[0] - self.target_radius * 0.2,
-            self.target_center_abs[1] - self.target_radius * 0.2,
-            self.target_radius * 0.4,
-            self.target_radius * 0.4
-        )
+        face_left, face_top = int(width * fx), int(height * fy)
+        if rect.top + face_top < 0:
+            self.y -= (rect.top + face_top)
+            rect.centery = self.y
+        self.face_abs_rect.update(rect.left + face_left, rect.top + face_top, int(width * fw), int(height * fh))
+        self.target_center_x = rect.left + int(width * 0.25) + tgt_size / 2
+        self.target_center_y = rect.top + int(height * 0.3) + tgt_size / 2
+        self.target_radius = radius = tgt_size / 2
+        self.red_circle_abs_rect.update(self.target_center_x - radius * 0.2, self.target_center_y - radius * 0.2, radius * 0.4, radius * 0.4)
         
+    def draw_rect(self, alpha):
+        # Position between the previous and the current tick, for smooth rendering above SIM_HZ
+        dx = (self.prev_centerx - self.rect.centerx) * (1 - alpha)
+        dy = (self.prev_centery - self.rect.centery) * (1 - alpha)
+        return self.rect.move(round(dx), round(dy))
+
     def update(self):
+        self.prev_centerx = self.rect.centerx
+        self.prev_centery = self.rect.centery
         if not self.falling:
             self.lane_change_timer -= 1
             if self.lane_change_timer <= 0:
                 possible_lanes = [l for l in self.LANES if l != self.target_lane_x]
                 if possible_lanes:
-                    self.target_lane_x = random.choice(possible_lanes)
-                self.lane_change_timer = random.randint(180, 300)
+                    self.target_lane_x = self.rng.choice(possible_lanes)
+                self.lane_change_timer = self.rng.randint(180, 300)
             self.x += (self.target_lane_x - self.x) * 0.02
             self.y += self.speed
             self.scale += self.speed * 0.003
             if self.y > 650:
-                if game.state == 'PLAYING':
-                    game.lose_life()
+                if self.on_escape is not None:
+                    self.on_escape()
                 self.kill()
             else:
                 self.update_image()
@@ -274,22 +1508,301 @@ class Target(pygame.sprite.Sprite):
     def fall(self):
         self.falling, self.fall_speed = True, 5
 
+# Sprite group that keeps its targets in a uniform grid keyed on their rects and in
+# depth order (y, then insertion order), both maintained incrementally. Clicks only
+# test the targets in the clicked cell and drawing walks depth_order without sorting.
+class TargetGroup(pygame.sprite.Group):
+    def __init__(self, *sprites, cell_size=TARGET_GRID_CELL, pool=None):
+        self.cell_size = cell_size
+        self.pool = pool  # Removed targets are handed back to this ObjectPool
+        self.columns = (SCREEN_WIDTH - 1) // cell_size + 1
+        self.rows = (SCREEN_HEIGHT - 1) // cell_size + 1
+        self.cells = {}
+        self.cell_ranges = {}
+        self.depth_order = []
+        self.next_seq = 0
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        sprite.depth_seq = self.next_seq
+        self.next_seq += 1
+        self.depth_order.append(sprite)
+        self.sort_depth()
+        self.index(sprite)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.depth_order.remove(sprite)
+        for cell in self.covered_cells(self.cell_ranges.pop(sprite)):
+            del self.cells[cell][sprite]
+        if self.pool is not None:
+            self.pool.release(sprite)
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.sort_depth()
+        for sprite in self.depth_order:
+            self.index(sprite)
+
+    def sort_depth(self):
+        # Insertion sort: targets rarely change places between ticks, so this is close to linear
+        order = self.depth_order
+        for i in range(1, len(order)):
+            sprite = order[i]
+            key = (sprite.y, sprite.depth_seq)
+            j = i - 1
+            while j >= 0 and (order[j].y, order[j].depth_seq) > key:
+                order[j + 1] = order[j]
+                j -= 1
+            order[j + 1] = sprite
+
+    def cell_range(self, rect):
+        size = self.cell_size
+        return (max(0, rect.left // size), max(0, rect.top // size),
+                min(self.columns - 1, (rect.right - 1) // size), min(self.rows - 1, (rect.bottom - 1) // size))
+
+    @staticmethod
+    def covered_cells(cell_range):
+        left, top, right, bottom = cell_range
+        return [(col, row) for col in range(left, right + 1) for row in range(top, bottom + 1)]
+
+    def index(self, sprite):
+        new_range = self.cell_range(sprite.rect)
+        old_range = self.cell_ranges.get(sprite)
+        if new_range == old_range:
+            return
+        if old_range is not None:
+            for cell in self.covered_cells(old_range):
+                del self.cells[cell][sprite]
+        for cell in self.covered_cells(new_range):
+            self.cells.setdefault(cell, {})[sprite] = None
+        self.cell_ranges[sprite] = new_range
+
+    def hit_candidates(self, pos):
+        # Front-most first: every scoring zone lies inside the target's rect
+        x, y = pos
+        if not (0 <= x < SCREEN_WIDTH and 0 <= y < SCREEN_HEIGHT):
+            return []
+        cell = (int(x) // self.cell_size, int(y) // self.cell_size)
+        found = [sprite for sprite in self.cells.get(cell, ()) if sprite.rect.collidepoint(pos)]
+        found.sort(key=lambda t: (-t.y, t.depth_seq))
+        return found
+
+# --- Swarm Simulation ---
+# Structure-of-arrays target backend for swarm mode. Every live target is one slot in a
+# set of numpy arrays, and each tick runs the same rules as Target.update (lane drift and
+# lane changes, descent, growth, falling, the escape check) as a few batched operations.
+# Swarm targets carry no splat decals, and escaping ones cost no lives: the mode is
+# scored on hits alone.
+class SwarmSimulation:
+    FIELDS = (('x', 'f8'), ('y', 'f8'), ('prev_x', 'f8'), ('prev_y', 'f8'), ('scale', 'f8'), ('speed', 'f8'),
+              ('fall_speed', 'f8'), ('lane', 'i4'), ('lane_timer', 'i4'), ('face', 'i4'), ('falling', '?'))
+
+    def __init__(self, base_silhouette_img, base_target_img, faces, speed_multiplier, seed, capacity=256):
+        self.base_silhouette_img = base_silhouette_img
+        self.base_target_img = base_target_img
+        self.faces = list(faces)
+        self.speed_multiplier = speed_multiplier
+        self.rng = np.random.default_rng(seed)
+        self.lanes = np.array(Target.LANES, dtype='f8')
+        self.images = {}
+        self.count = 0
+        self.capacity = 0
+        self.grow(capacity)
+
+    def __len__(self):
+        return self.count
+
+    def grow(self, capacity):
+        for name, dtype in self.FIELDS:
+            array = np.zeros(capacity, dtype=dtype)
+            if self.capacity:
+                array[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def spawn(self, k):
+        if k <= 0: return
+        if self.count + k > self.capacity:
+            self.grow(max(self.capacity * 2, self.count + k))
+        new = slice(self.count, self.count + k)
+        rng = self.rng
+        self.lane[new] = rng.integers(0, len(self.lanes), k)
+        self.x[new] = self.prev_x[new] = self.lanes[self.lane[new]]
+        self.y[new] = self.prev_y[new] = 60
+        self.scale[new] = 0.10
+        self.speed[new] = rng.uniform(0.5, 1.2, k) * self.speed_multiplier
+        self.fall_speed[new] = 0
+        self.falling[new] = False
+        self.lane_timer[new] = rng.integers(120, 241, k)
+        self.face[new] = rng.integers(0, len(self.faces), k) if self.faces else -1
+        self.count += k
+
+    def render_steps(self, scale):
+        steps = np.rint(scale * SWARM_SIZE_FACTOR / target_image_cache.scale_step).astype('i4')
+        return np.maximum(steps, 1)
+
+    def render_sizes(self, steps):
+        render_scale = steps * target_image_cache.scale_step
+        width = (self.base_silhouette_img.get_width() * render_scale).astype('i4')
+        height = (self.base_silhouette_img.get_height() * render_scale).astype('i4')
+        return width, height
+
+    def update(self):
+        n = self.count
+        if n == 0: return
+        x, y, scale, speed = self.x[:n], self.y[:n], self.scale[:n], self.speed[:n]
+        fall_speed, falling, lane, lane_timer = self.fall_speed[:n], self.falling[:n], self.lane[:n], self.lane_timer[:n]
+        self.prev_x[:n] = x
+        self.prev_y[:n] = y
+        active = ~falling
+
+        lane_timer -= active
+        change = active & (lane_timer <= 0)
+        changes = int(np.count_nonzero(change))
+        if changes:
+            # A random offset of 1..3 lanes always lands on one of the other lanes
+            lane[change] = (lane[change] + self.rng.integers(1, len(self.lanes), changes)) % len(self.lanes)
+            lane_timer[change] = self.rng.integers(180, 301, changes)
+
+        x += np.where(active, (self.lanes[lane] - x) * 0.02, 0.0)
+        y += np.where(active, speed, fall_speed)
+        scale += np.where(active, speed * 0.003, 0.0)
+        fall_speed += np.where(falling, 0.5, 0.0)
+
+        # Keep the face on screen, as Target.update_image does
+        _, height = self.render_sizes(self.render_steps(scale))
+        np.maximum(y, height * (0.5 - Target.FACE_BOX[1]), out=y)
+
+        gone = (active & (y > 650)) | (falling & (y > SCREEN_HEIGHT))
+        if gone.any():
+            keep = ~gone
+            remaining = int(np.count_nonzero(keep))
+            for name, _ in self.FIELDS:
+                array = getattr(self, name)
+                array[:remaining] = array[:n][keep]
+            self.count = remaining
+
+    def rects(self, alpha=1.0):
+        n = self.count
+        steps = self.render_steps(self.scale[:n])
+        width, height = self.render_sizes(steps)
+        center_x = self.prev_x[:n] + (self.x[:n] - self.prev_x[:n]) * alpha
+        center_y = self.prev_y[:n] + (self.y[:n] - self.prev_y[:n]) * alpha
+        left = np.rint(center_x).astype('i4') - width // 2
+        top = np.rint(center_y).astype('i4') - height // 2
+        return steps, left, top, width, height
+
+    def image(self, face_index, step):
+        # Private RLE copies of the cached composites: thousands of mostly transparent
+        # targets per frame make blitting the bottleneck, and RLE skips the empty runs
+        key = (face_index, step)
+        image = self.images.get(key)
+        if image is None:
+            face_img = self.faces[face_index] if face_index >= 0 else None
+            image = self.images[key] = target_image_cache.get(self.base_silhouette_img, self.base_target_img, face_img, step).copy()
+            image.set_alpha(255, pygame.RLEACCEL)
+        return image
+
+    def draw(self, surface, alpha=1.0):
+        n = self.count
+        if n == 0: return []
+        steps, left, top, width, height = self.rects(alpha)
+        if canvas_scale != 1:
+            # Same centres on the canvas, for images composited at canvas resolution
+            left = np.rint((left + width // 2) * canvas_scale).astype('i4') - (width * canvas_scale).astype('i4') // 2
+            top = np.rint((top + height // 2) * canvas_scale).astype('i4') - (height * canvas_scale).astype('i4') // 2
+        faces, steps, left, top = self.face[:n].tolist(), steps.tolist(), left.tolist(), top.tolist()
+        images = self.images
+        blits = []
+        for i in np.argsort(self.y[:n], kind='stable').tolist():
+            image = images.get((faces[i], steps[i])) or self.image(faces[i], steps[i])
+            blits.append((image, (left[i], top[i])))
+        return surface.blits(blits)
+
+    def hit_candidates(self, pos):
+        n = self.count
+        if n == 0: return []
+        px, py = pos
+        steps, left, top, width, height = self.rects()
+        inside = np.flatnonzero((left <= px) & (px < left + width) & (top <= py) & (py < top + height))
+        # Front-most (largest y) first, then in spawn order, like TargetGroup
+        order = inside[np.lexsort((inside, -self.y[inside]))]
+        return [SwarmTargetView(self, int(i), int(left[i]), int(top[i]), int(width[i]), int(height[i])) for i in order]
+
+# One swarm slot, with the hit-testing surface handle_gameplay expects from a Target.
+# Only valid until the next SwarmSimulation.update(), which may compact the arrays.
+class SwarmTargetView:
+    def __init__(self, swarm, index, left, top, width, height):
+        self.swarm = swarm
+        self.index = index
+        self.rect = pygame.Rect(left, top, width, height)
+        tgt_size = int(width * 0.5)
+        self.target_radius = tgt_size / 2
+        self.target_center_x = left + int(width * 0.25) + tgt_size / 2
+        self.target_center_y = top + int(height * 0.3) + tgt_size / 2
+        fx, fy, fw, fh = Target.FACE_BOX
+        self.face_abs_rect = pygame.Rect(left + int(width * fx), top + int(height * fy), int(width * fw), int(height * fh))
+
+    score_body = Target.score_body
+    is_face_hit = Target.is_face_hit
+
+    def add_splat(self, hit_pos, color):
+        pass
+
+    def fall(self):
+        self.swarm.falling[self.index] = True
+        self.swarm.fall_speed[self.index] = 5
+
 class Game:
-    def __init__(self):
+    def __init__(self, rng=None, input_source=None, faces=None, swarm_size=0, recorder=None):
+        self.rng = rng if rng is not None else random.Random()
+        self.input = input_source if input_source is not None else LiveInput()
+        self.recorder = recorder
+        self.faces = faces  # None means the faces chosen in the settings
+        if swarm_size and np is None:
+            print("Swarm mode needs numpy (pip install numpy); playing with regular targets.")
+            swarm_size = 0
+        self.swarm_size = swarm_size
+        self.swarm = None
         self.author_url = "https://github.com/eth08"
         self.state = 'MENU'
         self.clock = pygame.time.Clock()
-        self.high_scores = load_high_scores()
+        self.profiler = FrameProfiler()
+        self.profiler.set_enabled(os.environ.get('PAINT_HIT_PROFILE') == '1')
+        self.max_fps = int(game_settings.get('max_fps', 60))
+        self.accumulator = 0.0
+        self.render_mode = game_settings.get('render_mode', 'full')
+        self.prev_drawn_rects = None  # None: the screen holds more than background + last frame's rects
+        self.dirty_rects = None
+        # Only the interactive loop in run() is governed; headless runs keep full quality
+        self.quality = QualityGovernor(self.max_fps) if game_settings.get('quality_governor', True) else None
+        self.lean_hud = False  # Fixed-size combo banner, and an edge flash instead of a full-screen one
+        self.spawn_cap = None  # Most live targets spawn_target allows; set through SPAWN_CAP_EVENT
+        self.leaderboard = Leaderboard(LEADERBOARD_FILE, HIGHSCORE_FILE)
+        self.high_scores = []  # The rows of the board on show, refreshed when the high scores screen opens
+        self.high_scores_version = 0
+        self.score_save_failed = False  # Set by save_score on the persistence thread
         self.player = Player(gun_img)
         self.player_group = pygame.sprite.GroupSingle(self.player)
-        self.targets = pygame.sprite.Group()
+        self.target_pool = ObjectPool(Target)
+        self.targets = TargetGroup(pool=self.target_pool)
         self.speed_setting = game_settings.get('speed_setting', 'Normal')
-        self.speed_multipliers = {'Easy': 0.7, 'Normal': 1.0, 'Hard': 1.5}
+        self.speed_multipliers = dict(SPEED_MULTIPLIERS)
+        self.spawn_delay_ms = SPAWN_DELAY_MS
+        self.max_combo_time = COMBO_WINDOW_TICKS
+        self.combo_bonus_step = COMBO_BONUS_STEP
         self.challenge_duration_str = game_settings.get('challenge_duration', "60")
         try:
             self.challenge_duration = int(self.challenge_duration_str)
         except ValueError:
             self.challenge_duration = 60
+        self.run_board = ('PLAYING', self.speed_setting, 0)
+        self.run_rank = (1, 0)
+        self.run_qualifies = False
+        self.board = self.run_board
+        self.board_daily = False
         self.input_box_active = None
         self.player_name = ""
         self.last_path = game_settings.get('last_path', os.path.expanduser('~'))
@@ -297,8 +1810,12 @@ class Game:
         self.last_game_mode = 'PLAYING'
         self.running = True
 
-        self.flash_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        width, height = canvas_size()
+        self.flash_surface = pygame.Surface((width, height), pygame.SRCALPHA)
         self.flash_surface.fill((255, 0, 0, 128))
+        edge = to_canvas(12)
+        self.flash_edges = [pygame.Rect(0, 0, width, edge), pygame.Rect(0, height - edge, width, edge),
+                            pygame.Rect(0, edge, edge, height - 2 * edge), pygame.Rect(width - edge, edge, edge, height - 2 * edge)]
         self.flash_timer = 0
         
         self.face_slot_to_edit = None
@@ -329,6 +1846,22 @@ class Game:
         self.file_explorer_path = self.last_path
         self.file_explorer_mode = None
         self.scroll_offset = 0
+        gameplay_scene = GameplayScene(self)
+        game_over_scene = GameOverScene(self)
+        self.scenes = {
+            'PLAYING': gameplay_scene,
+            'TIMED_CHALLENGE': gameplay_scene,
+            'MENU': MenuScene(self),
+            'SETTINGS': SettingsScene(self),
+            'TIMED_CHALLENGE_SETUP': TimedChallengeSetupScene(self),
+            'CUSTOM_FACES': CustomFacesScene(self),
+            'HIGH_SCORES': HighScoresScene(self),
+            'ABOUT': AboutScene(self),
+            'FILE_EXPLORER': FileExplorerScene(self),
+            'GAME_OVER': game_over_scene,
+            'SAVE_AND_QUIT': game_over_scene,
+        }
+        self.active_scene = None
         self.reset()
 
     def lose_life(self):
@@ -353,68 +1886,183 @@ class Game:
         self.confirmation_active = None
         self.current_color = RED
         self.targets.empty()
+        self.swarm = None
+        self.world_layer = None
+        self.world_paint_rect = None
         self.game_over = False
-        self.start_time = pygame.time.get_ticks()
-        pygame.time.set_timer(SPAWN_TARGET_EVENT, 0)
+        self.sim_ticks = 0
+        self.input_frame = 0  # update_gameplay calls, paused or not; recorded input is keyed on it
+        self.spawn_timer = None
         self.combo_counter = 0
         self.combo_timer = 0
         self.last_game_mode = 'PLAYING'
-        self.max_combo_time = 180
 
     def start_game(self, mode):
         self.reset()
         self.state = mode
-        self.start_time = pygame.time.get_ticks()
-        pygame.time.set_timer(SPAWN_TARGET_EVENT, 2000, loops=1)
+        self.run_board = (mode, self.speed_setting, self.challenge_duration if mode == 'TIMED_CHALLENGE' else 0)
+        self.accumulator = 0.0
+        self.spawn_timer = ms_to_ticks(FIRST_SPAWN_DELAY_MS)
+        if self.recorder is not None:
+            # Each recorded game gets a fresh seed, so its log alone reproduces every roll
+            seed = random.SystemRandom().getrandbits(64)
+            self.rng.seed(seed)
+            self.recorder.start(self, seed)
+            self.recorder.record_pos(0, self.input.get_pos())
+        if self.swarm_size:
+            self.swarm = SwarmSimulation(silhouette_img, target_img, self.valid_faces(),
+                                         self.speed_multipliers[self.speed_setting], self.rng.getrandbits(64))
         pygame.mouse.set_visible(False)
 
+    def valid_faces(self):
+        faces = self.faces if self.faces is not None else loaded_custom_faces
+        return [face for face in faces if face is not None]
+
     def spawn_target(self):
-        valid_faces = [face for face in loaded_custom_faces if face is not None]
-        face = random.choice(valid_faces) if valid_faces else None
+        if self.swarm is not None:
+            # Top the swarm up every tick, filling it from empty in about SWARM_FILL_TICKS
+            batch = -(-self.swarm_size // SWARM_FILL_TICKS)
+            self.swarm.spawn(min(batch, self.swarm_size - len(self.swarm)))
+            self.spawn_timer = 1
+            return
+        if self.spawn_cap is not None and len(self.targets) >= self.spawn_cap:
+            self.spawn_timer = 1  # Check again next tick, without drawing from the RNG
+            return
+        valid_faces = self.valid_faces()
+        face = self.rng.choice(valid_faces) if valid_faces else None
         speed_mult = self.speed_multipliers[self.speed_setting]
-        self.targets.add(Target(silhouette_img, target_img, face, speed_mult))
-        delay = random.randint(1500, 3000)
-        pygame.time.set_timer(SPAWN_TARGET_EVENT, delay, loops=1)
+        self.targets.add(self.target_pool.acquire(silhouette_img, target_img, face, speed_mult, self.rng, self.lose_life))
+        delay = self.rng.randint(*self.spawn_delay_ms)
+        self.spawn_timer = ms_to_ticks(delay)
+
+    def paint_world(self, pos):
+        # Misses are baked once, at shot time, into a screen-sized copy of the background.
+        # draw_gameplay blits that copy instead of the background, so the per-frame cost
+        # and the memory stay the same however many misses land. The rotation comes from
+        # the position rather than self.rng, so gameplay rolls are unaffected.
+        if self.world_layer is None:
+            self.world_layer = background_img.copy()
+        rotation = (pos[0] * 7 + pos[1] * 13) % splat_atlas.rotation_steps
+        image = splat_atlas.get_canvas(self.current_color, rotation)
+        rect = self.world_layer.blit(image, image.get_rect(center=(to_canvas(pos[0]), to_canvas(pos[1]))))
+        self.world_paint_rect = rect if self.world_paint_rect is None else self.world_paint_rect.union(rect)
+
+    def elapsed_seconds(self):
+        return self.sim_ticks / SIM_HZ
+
+    def consume_sim_steps(self, frame_time):
+        # Turn real elapsed time into a whole number of fixed ticks, keeping the remainder
+        self.accumulator += min(frame_time, MAX_FRAME_TIME)
+        steps = 0
+        while self.accumulator >= SIM_DT:
+            self.accumulator -= SIM_DT
+            steps += 1
+        return steps
+
+    def enter_scene(self):
+        scene = self.scenes[self.state]
+        if scene is not self.active_scene:
+            if self.active_scene is not None:
+                self.active_scene.exit()
+            self.active_scene = scene
+            scene.enter()
+        return scene
+
+    def apply_quality(self, level):
+        name, image_stride, splat_image_stride, lean_hud, _ = QUALITY_LEVELS[level]
+        Target.image_stride = image_stride
+        Target.splat_image_stride = splat_image_stride
+        self.lean_hud = lean_hud
+        self.prev_drawn_rects = None
+        print(f"Quality level {level}: {name}")
+
+    def sync_spawn_cap(self):
+        # The cap changes the game, so it goes through the event queue: handle_gameplay applies
+        # it on the next frame and the recorder logs it like any other input
+        cap = QUALITY_LEVELS[self.quality.level][4]
+        if cap != self.spawn_cap:
+            pygame.event.post(pygame.event.Event(SPAWN_CAP_EVENT, cap=cap))
+
+    def track_overlay_rect(self, rect):
+        # Overlays drawn over the scene must be restored and pushed like the scene's own rects
+        if self.prev_drawn_rects is not None:
+            self.prev_drawn_rects.append(rect)
+            if self.dirty_rects is not None:
+                self.dirty_rects.append(rect)
 
     def run(self):
+        profiler = self.profiler
         while self.running:
-            events = pygame.event.get()
+            frame_start = time.perf_counter()
+            profiler.begin_frame()
+            events = self.input.get_events()
             for event in events:
                 if event.type == pygame.QUIT:
                     save_config()
                     self.running = False
-                if event.type == SPAWN_TARGET_EVENT and not self.paused and not self.game_over:
-                    self.spawn_target()
-
-            if self.state in ['PLAYING', 'TIMED_CHALLENGE']:
-                self.handle_gameplay(events)
-                self.update_gameplay()
-                self.draw_gameplay()
-            elif self.state == 'MENU':
-                self.handle_menu(events); self.draw_menu()
-            elif self.state == 'SETTINGS':
-                self.handle_settings(events); self.draw_settings()
-            elif self.state == 'TIMED_CHALLENGE_SETUP':
-                self.handle_timed_challenge_setup(events); self.draw_timed_challenge_setup()
-            elif self.state == 'CUSTOM_FACES':
-                self.handle_custom_faces(events); self.draw_custom_faces()
-            elif self.state == 'HIGH_SCORES':
-                self.handle_high_scores(events); self.draw_high_scores()
-            elif self.state == 'ABOUT':
-                self.handle_about(events); self.draw_about()
-            elif self.state == 'FILE_EXPLORER':
-                self.handle_file_explorer(events); self.draw_file_explorer()
-            elif self.state == 'GAME_OVER' or self.state == 'SAVE_AND_QUIT':
-                self.handle_game_over(events); self.draw_game_over()
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F11:
+                    try:
+                        pygame.display.toggle_fullscreen()
+                    except pygame.error as e:
+                        print(f"Could not toggle fullscreen: {e}")
+                if event.type in (pygame.VIDEORESIZE, pygame.WINDOWEXPOSED) or (event.type == pygame.KEYDOWN and event.key == pygame.K_F11):
+                    self.prev_drawn_rects = None  # The window was resized or uncovered: redraw and flip it all
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    profiler.toggle()
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F4 and profiler.count:
+                    print(f"Profiler trace written to {profiler.dump()}.csv/.json")
+            profiler.mark('events')
+
+            sim_steps = self.consume_sim_steps(self.clock.get_time() / 1000)
+            self.dirty_rects = None
+            if image_loader.poll():
+                self.prev_drawn_rects = None  # A new background or face needs a full redraw
+
+            scene = self.enter_scene()
+            scene.handle(events)
+            profiler.mark('handle')
+            scene.update(sim_steps)
+            if self.game_over and self.recorder is not None and self.recorder.active:
+                try:
+                    print(f"Replay saved to {self.recorder.finish(self)}")
+                except OSError as e:
+                    print(f"Could not save replay: {e}")
+            profiler.mark('update')
+            if ui_surface is not None and not isinstance(scene, GameplayScene):
+                draw_scaled_ui(scene.draw, self.accumulator / SIM_DT)
+                self.dirty_rects = None
+            else:
+                scene.draw(self.accumulator / SIM_DT)
             
             if self.error_timer > 0:
-                self.error_timer -= 1
+                self.error_timer = max(0, self.error_timer - sim_steps)
                 if self.error_timer == 0:
                     self.error_message = None
-
-            pygame.display.flip()
-            self.clock.tick(60)
-
+            profiler.mark('draw')
+
+            if image_loader.pending():
+                self.track_overlay_rect(draw_loading_indicator(screen))
+            overlay_rect = profiler.draw_overlay(screen)
+            if overlay_rect is not None:
+                self.track_overlay_rect(overlay_rect)
+            profiler.mark('overlay')
+            if self.dirty_rects is None:
+                pygame.display.flip()
+            else:
+                pygame.display.update(self.dirty_rects)
+            profiler.mark('flip')
+            if self.quality is not None and isinstance(scene, GameplayScene) and not self.paused:
+                if self.quality.record((time.perf_counter() - frame_start) * 1000):
+                    self.apply_quality(self.quality.level)
+                self.sync_spawn_cap()
+            self.clock.tick(self.max_fps)
+            profiler.mark('tick')
+            if profiler.enabled:
+                target_count = len(self.swarm) if self.swarm is not None else len(self.targets)
+                quality_level = self.quality.level if self.quality is not None else 0
+                profiler.end_frame(target_count, sum(t.splat_count for t in self.targets), quality_level)
+
+        persistence.flush()
         pygame.quit()
         sys.exit()
 
@@ -424,41 +2072,32 @@ class Game:
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if self.buttons['classic'].collidepoint(event.pos): self.start_game('PLAYING')
                 if self.buttons['timed'].collidepoint(event.pos): self.state = 'TIMED_CHALLENGE_SETUP'; self.input_box_active = 'timer'
-                if self.buttons['scores'].collidepoint(event.pos): self.state = 'HIGH_SCORES'
+                if self.buttons['scores'].collidepoint(event.pos): self.board = self.run_board; self.state = 'HIGH_SCORES'
                 if self.buttons['settings'].collidepoint(event.pos): self.state = 'SETTINGS'
                 if self.buttons['about'].collidepoint(event.pos): self.state = 'ABOUT'
                 if self.buttons['quit'].collidepoint(event.pos): save_config(); self.running = False
 
-    def draw_menu(self):
-        screen.blit(background_img, (0, 0))
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(180)
-        overlay.fill((20, 20, 20))
-        screen.blit(overlay, (0, 0))
-        title = font_large.render("Paint (H)it", True, YELLOW)
-        title_rect = title.get_rect(center=(SCREEN_WIDTH/2, 150))
-        screen.blit(title, title_rect)
-        draw_button("Classic Mode", self.buttons['classic'])
-        draw_button("Timed Challenge", self.buttons['timed'])
-        draw_button("High Scores", self.buttons['scores'])
-        draw_button("Settings", self.buttons['settings'])
-        draw_button("About", self.buttons['about'])
-        draw_button("Quit", self.buttons['quit'])
-        self.draw_error_overlay()
-
     def handle_gameplay(self, events):
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.record_pos(self.input_frame, self.input.get_pos())
         for event in events:
+            if recorder is not None:
+                recorder.record(self.input_frame, event)
+            if event.type == SPAWN_CAP_EVENT:
+                self.spawn_cap = event.cap
             # --- Handle Mouse Clicks (Shooting) ---
             if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and not self.paused and not self.game_over:
-                pos = pygame.mouse.get_pos()
+                pos = event.pos
                 shot_hit = False
-                for target in sorted(self.targets.sprites(), key=lambda t: t.y, reverse=True):
+                targets = self.swarm if self.swarm is not None else self.targets
+                for target in targets.hit_candidates(pos):
                     body_score = target.score_body(pos)
                     if body_score == 10:
                         shot_hit = True
                         self.combo_counter += 1
                         self.combo_timer = self.max_combo_time
-                        combo_bonus = self.combo_counter * 10
+                        combo_bonus = self.combo_counter * self.combo_bonus_step
                         self.score += body_score + combo_bonus
                         target.add_splat(pos, self.current_color)
                         target.fall()
@@ -480,6 +2119,7 @@ class Game:
                         break
                 if not shot_hit:
                     self.combo_counter = 0
+                    self.paint_world(pos)
 
             # --- Handle Keyboard Presses ---
             if event.type == pygame.KEYDOWN:
@@ -497,7 +2137,7 @@ class Game:
                         self.paused = False
                         self.confirmation_active = None
                         # Restart the spawn timer when unpausing from a confirmation.
-                        pygame.time.set_timer(SPAWN_TARGET_EVENT, 2000, loops=1)
+                        self.spawn_timer = ms_to_ticks(FIRST_SPAWN_DELAY_MS)
                     continue # Skip other key checks
 
                 # If no confirmation is active, handle normal game keys
@@ -507,7 +2147,7 @@ class Game:
                         self.paused = not self.paused
                         # If we just unpaused, restart the spawn timer.
                         if not self.paused:
-                            pygame.time.set_timer(SPAWN_TARGET_EVENT, 2000, loops=1)
+                            self.spawn_timer = ms_to_ticks(FIRST_SPAWN_DELAY_MS)
 
                     # Other actions only work if the game is not paused
                     if not self.paused:
@@ -536,8 +2176,11 @@ class Game:
                 if self.input_box_active == 'name_input':
                     if event.key == pygame.K_RETURN:
                         if self.player_name.strip():
-                            self.high_scores = add_high_score(self.player_name, self.score, self.high_scores)
-                            save_high_scores(self.high_scores)
+                            # The high scores screen picks the new row up once the insert commits
+                            run = (self.player_name, self.score, self.run_board)
+                            persistence.submit('score', lambda: self.save_score(*run), 0, merge=False)
+                            self.board = self.run_board
+                            self.board_daily = False
                             self.input_box_active = None
                             self.state = 'HIGH_SCORES'
                     elif event.key == pygame.K_BACKSPACE: 
@@ -550,7 +2193,15 @@ class Game:
                     if event.key == pygame.K_m: self.state = 'MENU'
 
     def update_gameplay(self):
-        if self.paused or self.game_over: return
+        if self.game_over: return
+        self.input_frame += 1
+        if self.paused: return
+
+        self.sim_ticks += 1
+        if self.spawn_timer is not None:
+            self.spawn_timer -= 1
+            if self.spawn_timer <= 0:
+                self.spawn_target()
         
         if self.flash_timer > 0:
             self.flash_timer -= 1
@@ -560,93 +2211,125 @@ class Game:
         else:
             self.combo_counter = 0
         
-        self.player_group.update()
-        self.targets.update()
+        self.player_group.update(self.input.get_pos()[0])
+        if self.swarm is not None:
+            self.swarm.update()
+        else:
+            self.targets.update()
 
         if self.state == 'TIMED_CHALLENGE':
-            elapsed = (pygame.time.get_ticks() - self.start_time) / 1000
-            if elapsed >= self.challenge_duration:
+            if self.elapsed_seconds() >= self.challenge_duration:
                 self.last_game_mode = self.state
                 self.game_over = True
                 self.state = 'GAME_OVER'
                 self.last_state = 'timed'
 
-    def draw_gameplay(self):
-        screen.blit(background_img, (0, 0))
-        for target in sorted(self.targets.sprites(), key=lambda t: t.y):
-            screen.blit(target.image, target.rect)
+    def draw_gameplay(self, alpha=1.0):
+        # Positions and sizes below are in game units, drawn at canvas resolution through c()
+        c = to_canvas
+        # In dirty mode everything that is not background lies inside last frame's
+        # rects, so restoring just those areas leaves a clean background to draw on.
+        partial = self.render_mode == 'dirty' and self.prev_drawn_rects is not None
+        world = self.world_layer if self.world_layer is not None else background_img
+        if partial:
+            restored = self.prev_drawn_rects
+            if self.world_paint_rect is not None:
+                restored = restored + [self.world_paint_rect]
+            for rect in restored:
+                screen.blit(world, rect, rect)
+        else:
+            screen.blit(world, (0, 0))
+        self.world_paint_rect = None
+        drawn = []
+
+        if self.swarm is not None:
+            drawn.extend(self.swarm.draw(screen, alpha))
+        for target in self.targets.depth_order:
+            # Centred, since a coarse image step can leave the image a little smaller than the rect
+            center_x, center_y = target.draw_rect(alpha).center
+            drawn.append(screen.blit(target.image, target.image.get_rect(center=(c(center_x), c(center_y)))))
             
-        score_text = font.render(f"Score: {self.score}", True, WHITE)
-        score_rect = score_text.get_rect(topleft=(10, 10))
-        bg_rect = score_rect.inflate(20, 10)
-        pygame.draw.rect(screen, (20, 20, 20, 200), bg_rect, border_radius=8)
+        score_text = render_text(f"Score: {self.score}", WHITE, c(FONT_SIZE))
+        score_rect = score_text.get_rect(topleft=(c(10), c(10)))
+        bg_rect = score_rect.inflate(c(20), c(10))
+        drawn.append(pygame.draw.rect(screen, (20, 20, 20, 200), bg_rect, border_radius=c(8)))
         screen.blit(score_text, score_rect)
 
         if self.combo_counter > 1:
-            scale = 1 + 0.1 * (self.combo_timer / self.max_combo_time)
-            scaled_font_size = int(50 * scale)
+            # The pulsing size renders a new banner most frames; the lean HUD keeps one size
+            scale = 1 if self.lean_hud else 1 + 0.1 * (self.combo_timer / self.max_combo_time)
+            scaled_font_size = c(int(50 * scale))
             if scaled_font_size > 0:
-                combo_font = pygame.font.Font(None, scaled_font_size)
-                combo_text = combo_font.render(f"x{self.combo_counter} Combo!", True, YELLOW)
-                combo_rect = combo_text.get_rect(center=(SCREEN_WIDTH // 2, 80))
-                bg_rect = combo_rect.inflate(20, 10)
-                pygame.draw.rect(screen, (20, 20, 20, 200), bg_rect, border_radius=8)
+                combo_text = render_text(f"x{self.combo_counter} Combo!", YELLOW, scaled_font_size)
+                combo_rect = combo_text.get_rect(center=(c(SCREEN_WIDTH // 2), c(80)))
+                bg_rect = combo_rect.inflate(c(20), c(10))
+                drawn.append(pygame.draw.rect(screen, (20, 20, 20, 200), bg_rect, border_radius=c(8)))
                 screen.blit(combo_text, combo_rect)     
                 
         if self.state == 'PLAYING':
-            lives_text = font.render(f"Lives: {self.lives}", True, WHITE)
-            lives_rect = lives_text.get_rect(topright=(SCREEN_WIDTH - 20, 10))
-            bg_rect = lives_rect.inflate(20, 10)
-            pygame.draw.rect(screen, (20, 20, 20, 200), bg_rect, border_radius=8)
+            lives_text = render_text(f"Lives: {self.lives}", WHITE, c(FONT_SIZE))
+            lives_rect = lives_text.get_rect(topright=(c(SCREEN_WIDTH - 20), c(10)))
+            bg_rect = lives_rect.inflate(c(20), c(10))
+            drawn.append(pygame.draw.rect(screen, (20, 20, 20, 200), bg_rect, border_radius=c(8)))
             screen.blit(lives_text, lives_rect)
         elif self.state == 'TIMED_CHALLENGE':
-            elapsed = (pygame.time.get_ticks() - self.start_time) / 1000
-            time_left = max(0, self.challenge_duration - elapsed)
-            timer_text = font.render(f"Time: {int(time_left)}s", True, WHITE)
-            timer_rect = timer_text.get_rect(topright=(SCREEN_WIDTH - 20, 10))
-            bg_rect = timer_rect.inflate(20, 10)
-            pygame.draw.rect(screen, (20, 20, 20, 200), bg_rect, border_radius=8)
+            time_left = max(0, self.challenge_duration - self.elapsed_seconds())
+            timer_text = render_text(f"Time: {int(time_left)}s", WHITE, c(FONT_SIZE))
+            timer_rect = timer_text.get_rect(topright=(c(SCREEN_WIDTH - 20), c(10)))
+            bg_rect = timer_rect.inflate(c(20), c(10))
+            drawn.append(pygame.draw.rect(screen, (20, 20, 20, 200), bg_rect, border_radius=c(8)))
             screen.blit(timer_text, timer_rect)
 
         for i, color in enumerate([RED, GREEN, BLUE, YELLOW]):
-            rect = pygame.Rect(10 + i * 50, 60, 40, 40)
-            pygame.draw.rect(screen, (20, 20, 20, 200), rect.inflate(10, 10), border_radius=6)
+            rect = pygame.Rect(c(10 + i * 50), c(60), c(40), c(40))
+            drawn.append(pygame.draw.rect(screen, (20, 20, 20, 200), rect.inflate(c(10), c(10)), border_radius=c(6)))
             pygame.draw.rect(screen, color, rect)
             if color == self.current_color:
-                pygame.draw.rect(screen, WHITE, rect, 2)
+                pygame.draw.rect(screen, WHITE, rect, c(2))
 
-        if not self.game_over: self.player_group.draw(screen)
+        if not self.game_over: drawn.append(screen.blit(self.player.image, (c(self.player.rect.x), c(self.player.rect.y))))
         
         if self.paused and not self.game_over:
-            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+            overlay = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
             overlay.fill((0, 0, 0, 150))
-            screen.blit(overlay, (0, 0))
+            drawn.append(screen.blit(overlay, (0, 0)))
             
             if self.confirmation_active is not None:
                 if self.confirmation_active == 'restart':
-                    title = font_large.render("Restart Game?", True, YELLOW)
-                    prompt = font_medium.render("Y / N", True, TEXT_COLOR)
+                    title = render_text("Restart Game?", YELLOW, c(FONT_SIZE_LARGE))
+                    prompt = render_text("Y / N", TEXT_COLOR, c(FONT_SIZE_MEDIUM))
                 else:
-                    title = font_large.render("Quit Game?", True, YELLOW)
-                    prompt = font_medium.render("Y (Save & Quit) / N (Continue)", True, TEXT_COLOR)
+                    title = render_text("Quit Game?", YELLOW, c(FONT_SIZE_LARGE))
+                    prompt = render_text("Y (Save & Quit) / N (Continue)", TEXT_COLOR, c(FONT_SIZE_MEDIUM))
                 
-                screen.blit(title, (SCREEN_WIDTH/2 - title.get_width()/2, 300))
-                screen.blit(prompt, (SCREEN_WIDTH/2 - prompt.get_width()/2, 400))
+                screen.blit(title, (c(SCREEN_WIDTH/2) - title.get_width()/2, c(300)))
+                screen.blit(prompt, (c(SCREEN_WIDTH/2) - prompt.get_width()/2, c(400)))
             else:
-                pause_text = font_large.render("PAUSED", True, YELLOW)
-                screen.blit(pause_text, (SCREEN_WIDTH/2 - pause_text.get_width()/2, SCREEN_HEIGHT/2 - 50))
+                pause_text = render_text("PAUSED", YELLOW, c(FONT_SIZE_LARGE))
+                screen.blit(pause_text, (c(SCREEN_WIDTH/2) - pause_text.get_width()/2, c(SCREEN_HEIGHT/2 - 50)))
         
         if self.flash_timer > 0:
-            screen.blit(self.flash_surface, (0, 0))
+            if self.lean_hud:
+                drawn.extend(screen.fill((255, 0, 0), edge) for edge in self.flash_edges)
+            else:
+                drawn.append(screen.blit(self.flash_surface, (0, 0)))
             
         if not self.paused and not self.game_over:
             pygame.mouse.set_visible(False)
-            mouse_pos = pygame.mouse.get_pos()
-            pygame.draw.line(screen, WHITE, (mouse_pos[0]-10, mouse_pos[1]), (mouse_pos[0]+10, mouse_pos[1]), 2)
-            pygame.draw.line(screen, WHITE, (mouse_pos[0], mouse_pos[1]-10), (mouse_pos[0], mouse_pos[1]+10), 2)
+            x, y = (c(v) for v in self.input.get_pos())
+            arm, width = c(10), max(1, c(2))
+            drawn.append(pygame.draw.line(screen, WHITE, (x - arm, y), (x + arm, y), width))
+            drawn.append(pygame.draw.line(screen, WHITE, (x, y - arm), (x, y + arm), width))
         elif self.paused and not self.game_over:
              pygame.mouse.set_visible(True)
 
+        if partial:
+            dirty = restored + drawn
+            dirty_area = sum(rect.width * rect.height for rect in dirty)
+            if dirty_area <= screen.get_width() * screen.get_height() * DIRTY_RECT_MAX_FRACTION:
+                self.dirty_rects = dirty
+        self.prev_drawn_rects = drawn
+
     def handle_timed_challenge_setup(self, events):
         pygame.mouse.set_visible(True)
         for event in events:
@@ -664,21 +2347,6 @@ class Game:
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if self.buttons['back_timed_setup'].collidepoint(event.pos): self.state = 'MENU'
 
-    def draw_timed_challenge_setup(self):
-        screen.blit(background_img, (0, 0))
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(180)
-        overlay.fill((20, 20, 20))
-        screen.blit(overlay, (0, 0))
-        title = font_large.render("Timed Challenge Setup", True, YELLOW)
-        screen.blit(title, (SCREEN_WIDTH/2 - title.get_width()/2, 180))
-        timer_title = font_medium.render("Enter Time (seconds)", True, TEXT_COLOR)
-        screen.blit(timer_title, (SCREEN_WIDTH/2 - timer_title.get_width()/2, 260))
-        draw_input_box(self.challenge_duration_str, SCREEN_WIDTH/2 - 150, 320, 300, 50)
-        start_prompt = font.render("Press ENTER to start", True, GREEN)
-        screen.blit(start_prompt, (SCREEN_WIDTH/2 - start_prompt.get_width()/2, 400))
-        draw_button("Back to Menu", self.buttons['back_timed_setup'])
-
     def handle_settings(self, events):
         global game_settings
         pygame.mouse.set_visible(True)
@@ -695,24 +2363,6 @@ class Game:
                     self.file_explorer_path = self.last_path
                 if self.buttons['back_settings'].collidepoint(event.pos): self.state = 'MENU'
 
-    def draw_settings(self):
-        screen.blit(background_img, (0, 0))
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(180)
-        overlay.fill((20, 20, 20))
-        screen.blit(overlay, (0, 0))
-        title = font_large.render("Settings", True, YELLOW)
-        screen.blit(title, (SCREEN_WIDTH/2 - title.get_width()/2, 120))
-        speed_title = font_medium.render("Target Speed", True, GREEN)
-        screen.blit(speed_title, (SCREEN_WIDTH/2 - speed_title.get_width()/2, 220))
-        draw_button("Easy", self.buttons['easy'], highlight=self.speed_setting == 'Easy')
-        draw_button("Normal", self.buttons['normal'], highlight=self.speed_setting == 'Normal')
-        draw_button("Hard", self.buttons['hard'], highlight=self.speed_setting == 'Hard')
-        draw_button("Faces", self.buttons['faces'])
-        draw_button("Background", self.buttons['background'])
-        draw_button("Back to Menu", self.buttons['back_settings'])
-        self.draw_error_overlay()
-
     def handle_custom_faces(self, events):
         pygame.mouse.set_visible(True)
         for event in events:
@@ -728,40 +2378,20 @@ class Game:
                         self.scroll_offset = 0
                         break
 
-    def draw_custom_faces(self):
-        screen.blit(background_img, (0, 0))
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(180)
-        overlay.fill((20, 20, 20))
-        screen.blit(overlay, (0, 0))
-        title = font_large.render("Custom Faces", True, YELLOW)
-        screen.blit(title, (SCREEN_WIDTH/2 - title.get_width()/2, 100))
-        info_text = font.render("Click any slot to upload or change an image.", True, TEXT_COLOR)
-        screen.blit(info_text, (SCREEN_WIDTH/2 - info_text.get_width()/2, 180))
-        for i, frame_rect in enumerate(self.face_upload_rects):
-            pygame.draw.rect(screen, BUTTON_COLOR, frame_rect, border_radius=15)
-            pygame.draw.rect(screen, HIGHLIGHT_COLOR, frame_rect, border_radius=15, width=3)
-            face_img = loaded_custom_faces[i]
-            if face_img:
-                face_img_scaled = pygame.transform.scale(face_img, (150, 150))
-                screen.blit(face_img_scaled, face_img_scaled.get_rect(center=frame_rect.center))
-            else:
-                qm_img = pygame.transform.scale(question_mark_img, (100, 100))
-                screen.blit(qm_img, qm_img.get_rect(center=frame_rect.center))
-        draw_button("Back to Settings", self.buttons['back_faces'])
-
     def draw_error_overlay(self):
         if self.error_message:
-            error_font = pygame.font.Font(None, 60)
-            text_surface = error_font.render(self.error_message, True, WHITE)
+            text_surface = render_text(self.error_message, WHITE, 60)
             text_rect = text_surface.get_rect(center=(SCREEN_WIDTH // 2, 60))
             bg_rect = text_rect.inflate(40, 20)
             pygame.draw.rect(screen, (200, 0, 0), bg_rect, border_radius=10)
             pygame.draw.rect(screen, (255, 255, 255), bg_rect, 3, border_radius=10)
             screen.blit(text_surface, text_rect)
 
+    def image_load_failed(self, error):
+        self.error_message = "Could not load image!"
+        self.error_timer = 180
+
     def handle_file_explorer(self, events):
-        global custom_faces_paths, loaded_custom_faces, custom_background_path, background_img, game_settings
         pygame.mouse.set_visible(True)
         file_list_rect = pygame.Rect(50, 180, SCREEN_WIDTH - 100, SCREEN_HEIGHT - 320)
         
@@ -776,23 +2406,18 @@ class Game:
                     return
 
             if event.type == pygame.MOUSEBUTTONDOWN and file_list_rect.collidepoint(event.pos):
-                try:
-                    items = sorted(os.listdir(self.file_explorer_path), 
-                                   key=lambda s: os.path.isdir(os.path.join(self.file_explorer_path, s)), 
-                                   reverse=True)
-                    if self.file_explorer_path != os.path.abspath(os.sep):
-                        items.insert(0, ".. (Back)")
-                except OSError as e:
-                    self.error_message = f"Cannot access directory: {e.strerror}"
+                items = directory_model.entries(self.file_explorer_path)
+                error = directory_model.error(self.file_explorer_path)
+                if error:
+                    self.error_message = f"Cannot access directory: {error.strerror}"
                     self.error_timer = 180
-                    items = []
 
                 clicked_index = int((event.pos[1] - file_list_rect.y + self.scroll_offset) / 50)
 
                 if 0 <= clicked_index < len(items):
-                    item_name = items[clicked_index]
+                    item_name, is_dir = items[clicked_index]
                     
-                    if item_name == ".. (Back)":
+                    if (item_name, is_dir) == DirectoryModel.BACK_ENTRY:
                         self.file_explorer_path = os.path.abspath(os.path.join(self.file_explorer_path, os.pardir))
                         self.scroll_offset = 0
                         game_settings['last_path'] = self.file_explorer_path
@@ -801,7 +2426,7 @@ class Game:
 
                     full_path = os.path.join(self.file_explorer_path, item_name)
 
-                    if os.path.isdir(full_path):
+                    if is_dir:
                         self.file_explorer_path = full_path
                         self.scroll_offset = 0
                         game_settings['last_path'] = self.file_explorer_path
@@ -813,170 +2438,131 @@ class Game:
                             self.error_timer = 180
                             break
 
-                        try:
-                            if self.file_explorer_mode == 'background':
-                                new_bg = pygame.image.load(full_path).convert()
-                                background_img = pygame.transform.scale(new_bg, (SCREEN_WIDTH, SCREEN_HEIGHT))
-                                custom_background_path = full_path
-                                self.state = 'SETTINGS'
-                            
-                            elif self.file_explorer_mode == 'faces' and self.face_slot_to_edit is not None:
-                                new_face = pygame.image.load(full_path).convert_alpha()
-                                slot_index = self.face_slot_to_edit
-                                loaded_custom_faces[slot_index] = new_face
-                                custom_faces_paths[slot_index] = full_path
-                                self.state = 'CUSTOM_FACES'
-                                self.face_slot_to_edit = None
-                            
-                            self.last_path = os.path.dirname(full_path)
-                            game_settings['last_path'] = self.last_path
-                            save_config()
-
-                        except pygame.error as e:
-                            self.error_message = "Could not load image!"
-                            self.error_timer = 180
-                            print(f"Error loading image '{full_path}': {e}")
+                        if self.file_explorer_mode == 'background':
+                            load_custom_background(full_path, save_config, self.image_load_failed)
+                            self.state = 'SETTINGS'
+
+                        elif self.file_explorer_mode == 'faces' and self.face_slot_to_edit is not None:
+                            load_custom_face(self.face_slot_to_edit, full_path, save_config, self.image_load_failed)
+                            self.state = 'CUSTOM_FACES'
+                            self.face_slot_to_edit = None
+
+                        self.last_path = os.path.dirname(full_path)
+                        game_settings['last_path'] = self.last_path
+                        save_config()
                         break
             
             if event.type == pygame.MOUSEWHEEL:
                 self.scroll_offset -= event.y * 20
-                try:
-                    num_items = len(os.listdir(self.file_explorer_path))
-                    if self.file_explorer_path != os.path.abspath(os.sep):
-                        num_items += 1
-                except OSError:
-                    num_items = 0
-                
+                num_items = len(directory_model.entries(self.file_explorer_path))
                 max_scroll = max(0, num_items * 50 - file_list_rect.height)
                 self.scroll_offset = max(0, min(self.scroll_offset, max_scroll))
 
     def draw_file_explorer(self):
-        screen.blit(background_img, (0, 0))
+        screen.blit(ui_background(), (0, 0))
         active_tooltip_info = None
         header_box = pygame.Surface((SCREEN_WIDTH - 100, 140), pygame.SRCALPHA)
         header_box.fill((0, 0, 0, 180))
         screen.blit(header_box, (50, 30))
-        title = font_large.render("File Explorer", True, YELLOW)
+        title = render_text("File Explorer", YELLOW, FONT_SIZE_LARGE)
         title_rect = title.get_rect(center=(SCREEN_WIDTH // 2, 60))
         screen.blit(title, title_rect)
 
-        def truncate_text(text, max_width, font):
-            if font.size(text)[0] <= max_width:
-                return text
-            while font.size(text + "...")[0] > max_width and len(text) > 0:
-                text = text[:-1]
-            return text + "..."
-
         max_text_width = SCREEN_WIDTH - 120
         full_current_path = f"Current Path: {self.file_explorer_path}"
-        truncated_current_path = truncate_text(full_current_path, max_text_width, font)
-        path_text = font.render(truncated_current_path, True, TEXT_COLOR)
+        truncated_current_path = truncate_text(full_current_path, max_text_width)
+        path_text = render_text(truncated_current_path, TEXT_COLOR)
         path_rect = path_text.get_rect(center=(SCREEN_WIDTH // 2, 100))
         screen.blit(path_text, path_rect)
-        if truncated_current_path.endswith("...") and path_rect.collidepoint(pygame.mouse.get_pos()):
-            tooltip_rect = font_small.render(full_current_path, True, GREY).get_rect(center=(SCREEN_WIDTH // 2, path_rect.bottom + 20))
+        if truncated_current_path.endswith("...") and path_rect.collidepoint(mouse_pos()):
+            tooltip_rect = render_text(full_current_path, GREY, FONT_SIZE_SMALL).get_rect(center=(SCREEN_WIDTH // 2, path_rect.bottom + 20))
             active_tooltip_info = (full_current_path, tooltip_rect)
 
         if custom_background_path:
             full_bg_path = f"Background: {custom_background_path}"
-            truncated_bg_path = truncate_text(full_bg_path, max_text_width, font_small)
-            bg_path_text = font_small.render(truncated_bg_path, True, GREEN)
+            truncated_bg_path = truncate_text(full_bg_path, max_text_width, FONT_SIZE_SMALL)
+            bg_path_text = render_text(truncated_bg_path, GREEN, FONT_SIZE_SMALL)
             bg_path_rect = bg_path_text.get_rect(center=(SCREEN_WIDTH // 2, 130))
             screen.blit(bg_path_text, bg_path_rect)
-            if truncated_bg_path.endswith("...") and bg_path_rect.collidepoint(pygame.mouse.get_pos()):
-                tooltip_rect = font_small.render(full_bg_path, True, GREY).get_rect(center=(SCREEN_WIDTH // 2, bg_path_rect.bottom + 20))
+            if truncated_bg_path.endswith("...") and bg_path_rect.collidepoint(mouse_pos()):
+                tooltip_rect = render_text(full_bg_path, GREY, FONT_SIZE_SMALL).get_rect(center=(SCREEN_WIDTH // 2, bg_path_rect.bottom + 20))
                 active_tooltip_info = (full_bg_path, tooltip_rect)
 
         file_list_rect = pygame.Rect(50, 180, SCREEN_WIDTH - 100, SCREEN_HEIGHT - 320)
         pygame.draw.rect(screen, BUTTON_COLOR, file_list_rect, border_radius=10)
 
-        try:
-            items = sorted(os.listdir(self.file_explorer_path), key=lambda s: os.path.isdir(os.path.join(self.file_explorer_path, s)), reverse=True)
-            if self.file_explorer_path != os.path.abspath(os.sep):
-                items.insert(0, ".. (Back)")
-        except OSError:
-            items = []
+        items = directory_model.entries(self.file_explorer_path)
 
         content_height = len(items) * 50
         max_scroll = max(0, content_height - file_list_rect.height)
         self.scroll_offset = max(0, min(self.scroll_offset, max_scroll))
-        file_list_surface = pygame.Surface((file_list_rect.width, file_list_rect.height), pygame.SRCALPHA)
-        file_list_surface.fill(BUTTON_COLOR)
-
-        for i, item in enumerate(items):
-            item_y_pos = i * 50 - self.scroll_offset
-            if -50 < item_y_pos < file_list_rect.height:
-                is_dir = os.path.isdir(os.path.join(self.file_explorer_path, item.replace(".. (Back)", os.pardir)))
-                color = HIGHLIGHT_COLOR if is_dir or item.startswith("..") else TEXT_COLOR
-                truncated_item = truncate_text(item, file_list_rect.width - 20, font)
-                item_text = font.render(truncated_item, True, color)
-                item_rect_on_surface = item_text.get_rect(topleft=(5, item_y_pos + 5))
-                mouse_pos_rel = (pygame.mouse.get_pos()[0] - file_list_rect.x, pygame.mouse.get_pos()[1] - file_list_rect.y)
-                if item_rect_on_surface.inflate(10,10).collidepoint(mouse_pos_rel):
-                    pygame.draw.rect(file_list_surface, HOVER_COLOR, (0, item_y_pos, file_list_rect.width, 50), border_radius=5)
-                    if truncated_item.endswith("..."):
-                        tooltip_rect = font_small.render(item, True, GREY).get_rect(midleft=(pygame.mouse.get_pos()[0] + 15, pygame.mouse.get_pos()[1]))
-                        active_tooltip_info = (item, tooltip_rect)
-                file_list_surface.blit(item_text, item_rect_on_surface)
-
-        screen.blit(file_list_surface, file_list_rect.topleft)
+
+        # Only the rows inside the list rect are measured and rendered, clipped to it
+        mouse_x, mouse_y = mouse_pos()
+        first_row = self.scroll_offset // 50
+        last_row = min(len(items), (self.scroll_offset + file_list_rect.height) // 50 + 1)
+        screen.set_clip(file_list_rect)
+        for i in range(first_row, last_row):
+            item, is_dir = items[i]
+            item_y_pos = file_list_rect.y + i * 50 - self.scroll_offset
+            color = HIGHLIGHT_COLOR if is_dir else TEXT_COLOR
+            truncated_item = truncate_text(item, file_list_rect.width - 20)
+            item_text = render_text(truncated_item, color)
+            item_rect = item_text.get_rect(topleft=(file_list_rect.x + 5, item_y_pos + 5))
+            if item_rect.inflate(10, 10).collidepoint(mouse_x, mouse_y) and file_list_rect.collidepoint(mouse_x, mouse_y):
+                pygame.draw.rect(screen, HOVER_COLOR, (file_list_rect.x, item_y_pos, file_list_rect.width, 50), border_radius=5)
+                if truncated_item.endswith("..."):
+                    tooltip_rect = render_text(item, GREY, FONT_SIZE_SMALL).get_rect(midleft=(mouse_x + 15, mouse_y))
+                    active_tooltip_info = (item, tooltip_rect)
+            screen.blit(item_text, item_rect)
+        screen.set_clip(None)
+
         draw_button("Back", self.buttons['back_file_explorer'])
         
         if active_tooltip_info:
             text, rect = active_tooltip_info
-            tooltip_surf = font_small.render(text, True, WHITE)
+            tooltip_surf = render_text(text, WHITE, FONT_SIZE_SMALL)
             bg_rect = rect.inflate(20, 10)
             pygame.draw.rect(screen, (0, 0, 0, 220), bg_rect, border_radius=8)
             screen.blit(tooltip_surf, rect)
 
+    def rank_run(self):
+        # Looked up once per game over: whether the run can be saved, and where it places
+        self.run_qualifies = self.leaderboard.qualifies(self.score, self.run_board)
+        self.run_rank = self.leaderboard.rank(self.score, self.run_board)
+
+    def save_score(self, name, score, board):
+        # Runs on the persistence thread; HighScoresScene.update reports a failure
+        try:
+            self.leaderboard.add(name, score, board)
+        except sqlite3.Error as e:
+            print(f"Could not save score: {e}")
+            self.score_save_failed = True
+
+    def refresh_high_scores(self):
+        self.high_scores_version = self.leaderboard.version
+        self.high_scores = self.leaderboard.top(self.board, today() if self.board_daily else None)
+
     def handle_high_scores(self, events):
         pygame.mouse.set_visible(True)
         for event in events:
             if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE: self.state = 'MENU'
+            # TAB switches Classic/Timed, LEFT/RIGHT the difficulty, D between all-time and today's board
+            if event.type == pygame.KEYDOWN and event.key in (pygame.K_TAB, pygame.K_LEFT, pygame.K_RIGHT, pygame.K_d):
+                mode, difficulty, duration = self.board
+                if event.key == pygame.K_TAB:
+                    mode = 'TIMED_CHALLENGE' if mode == 'PLAYING' else 'PLAYING'
+                    duration = self.challenge_duration if mode == 'TIMED_CHALLENGE' else 0
+                elif event.key == pygame.K_d:
+                    self.board_daily = not self.board_daily
+                else:
+                    difficulties = list(self.speed_multipliers)
+                    step = 1 if event.key == pygame.K_RIGHT else -1
+                    difficulty = difficulties[(difficulties.index(difficulty) + step) % len(difficulties)]
+                self.board = (mode, difficulty, duration)
+                self.refresh_high_scores()
             if event.type == pygame.MOUSEBUTTONDOWN and self.buttons['back_scores'].collidepoint(event.pos): self.state = 'MENU'
 
-    def draw_high_scores(self):
-        screen.blit(background_img, (0, 0))
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(180)
-        overlay.fill((20, 20, 20))
-        screen.blit(overlay, (0, 0))
-        title = font_large.render("Top 10 High Scores", True, YELLOW)
-        screen.blit(title, (SCREEN_WIDTH/2 - title.get_width()/2, 50))
-        if not self.high_scores:
-            no_scores = font_medium.render("No scores yet!", True, TEXT_COLOR)
-            no_scores_rect = no_scores.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
-            screen.blit(no_scores, no_scores_rect)
-        else:
-            row_height = 50
-            table_height = (len(self.high_scores) + 1) * row_height
-            start_y = (SCREEN_HEIGHT - table_height) // 2
-            col_spacing_name = 80
-            col_spacing_score = 150
-            rank_width = max(font_medium.size(f"{i+1}.")[0] for i in range(len(self.high_scores)))
-            name_width = max(font_medium.size(entry['name'])[0] for entry in self.high_scores)
-            score_width = max(font_medium.size(str(entry['score']))[0] for entry in self.high_scores)
-            total_width = rank_width + col_spacing_name + name_width + col_spacing_score + score_width
-            start_x = (SCREEN_WIDTH - total_width) // 2
-            header_rank = font_medium.render("Rank", True, GREEN)
-            header_name = font_medium.render("Name", True, GREEN)
-            header_score = font_medium.render("Score", True, GREEN)
-            screen.blit(header_rank, (start_x + (rank_width - header_rank.get_width()), start_y))
-            screen.blit(header_name, (start_x + rank_width + col_spacing_name, start_y))
-            screen.blit(header_score, (start_x + rank_width + col_spacing_name + name_width + col_spacing_score + (score_width - header_score.get_width()), start_y))
-            for i, entry in enumerate(self.high_scores):
-                rank_text = f"{i+1}."
-                name_text, score_text = entry['name'], str(entry['score'])
-                rank = font_medium.render(rank_text, True, HIGHLIGHT_COLOR)
-                name = font_medium.render(name_text, True, TEXT_COLOR)
-                score = font_medium.render(score_text, True, TEXT_COLOR)
-                y = start_y + (i+1) * row_height
-                screen.blit(rank, (start_x + (rank_width - rank.get_width()), y))
-                screen.blit(name, (start_x + rank_width + col_spacing_name, y))
-                screen.blit(score, (start_x + rank_width + col_spacing_name + name_width + col_spacing_score + (score_width - score.get_width()), y))
-        draw_button("Back to Menu", self.buttons['back_scores'])
-        self.draw_error_overlay()
-
     def handle_about(self, events):
         pygame.mouse.set_visible(True)
         for event in events:
@@ -986,82 +2572,313 @@ class Game:
                 if self.buttons['back_about'].collidepoint(event.pos):
                     self.state = 'MENU'
 
-    def draw_about(self):
-        screen.blit(background_img, (0, 0))
+# --- Scenes ---
+# One scene per screen. Menu-style scenes pre-render their static layer (background,
+# dim overlay, titles and labels) once and rebuild it only when layer_key() changes;
+# each frame then blits that layer and draws the dynamic parts (buttons, input, errors).
+class Scene:
+    def __init__(self, game):
+        self.game = game
+        self.static_layer = None
+        self.static_key = None
+
+    def enter(self):
+        pygame.mouse.set_visible(True)
+
+    def exit(self):
+        pass
+
+    def handle(self, events):
+        pass
+
+    def update(self, sim_steps):
+        pass
+
+    def layer_key(self):
+        return (background_img,)
+
+    def draw_static(self, surface):
+        surface.blit(ui_background(), (0, 0))
         overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
         overlay.set_alpha(180)
         overlay.fill((20, 20, 20))
-        screen.blit(overlay, (0, 0))
-        title = font_large.render("Paint (H)it", True, YELLOW)
-        screen.blit(title, (SCREEN_WIDTH/2 - title.get_width()/2, 100))
-        info_lines = [
-            f"Version: v{__version__}",
-            "",
-            "A fun and simple target shooting game.",
-            "Hit the bullseye for a combo streak!",
-            "Customize faces and backgrounds to your liking."
-        ]
+        surface.blit(overlay, (0, 0))
+
+    def draw_dynamic(self):
+        pass
+
+    def draw(self, alpha):
+        key = self.layer_key()
+        if self.static_layer is None or key != self.static_key:
+            self.static_layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+            self.draw_static(self.static_layer)
+            self.static_key = key
+        screen.blit(self.static_layer, (0, 0))
+        self.draw_dynamic()
+
+def blit_centered(surface, text_surf, y):
+    surface.blit(text_surf, (SCREEN_WIDTH/2 - text_surf.get_width()/2, y))
+
+class GameplayScene(Scene):
+    def enter(self):
+        self.game.prev_drawn_rects = None
+
+    def exit(self):
+        self.game.prev_drawn_rects = None
+
+    def handle(self, events):
+        self.game.handle_gameplay(events)
+
+    def update(self, sim_steps):
+        for _ in range(sim_steps):
+            self.game.update_gameplay()
+
+    def draw(self, alpha):
+        self.game.draw_gameplay(alpha)
+
+class MenuScene(Scene):
+    def handle(self, events):
+        self.game.handle_menu(events)
+
+    def draw_static(self, surface):
+        super().draw_static(surface)
+        title = render_text("Paint (H)it", YELLOW, FONT_SIZE_LARGE)
+        surface.blit(title, title.get_rect(center=(SCREEN_WIDTH/2, 150)))
+
+    def draw_dynamic(self):
+        buttons = self.game.buttons
+        draw_button("Classic Mode", buttons['classic'])
+        draw_button("Timed Challenge", buttons['timed'])
+        draw_button("High Scores", buttons['scores'])
+        draw_button("Settings", buttons['settings'])
+        draw_button("About", buttons['about'])
+        draw_button("Quit", buttons['quit'])
+        self.game.draw_error_overlay()
+
+class TimedChallengeSetupScene(Scene):
+    def handle(self, events):
+        self.game.handle_timed_challenge_setup(events)
+
+    def draw_static(self, surface):
+        super().draw_static(surface)
+        blit_centered(surface, render_text("Timed Challenge Setup", YELLOW, FONT_SIZE_LARGE), 180)
+        blit_centered(surface, render_text("Enter Time (seconds)", TEXT_COLOR, FONT_SIZE_MEDIUM), 260)
+        blit_centered(surface, render_text("Press ENTER to start", GREEN), 400)
+
+    def draw_dynamic(self):
+        draw_input_box(self.game.challenge_duration_str, SCREEN_WIDTH/2 - 150, 320, 300, 50)
+        draw_button("Back to Menu", self.game.buttons['back_timed_setup'])
+
+class SettingsScene(Scene):
+    def handle(self, events):
+        self.game.handle_settings(events)
+
+    def draw_static(self, surface):
+        super().draw_static(surface)
+        blit_centered(surface, render_text("Settings", YELLOW, FONT_SIZE_LARGE), 120)
+        blit_centered(surface, render_text("Target Speed", GREEN, FONT_SIZE_MEDIUM), 220)
+
+    def draw_dynamic(self):
+        game, buttons = self.game, self.game.buttons
+        draw_button("Easy", buttons['easy'], highlight=game.speed_setting == 'Easy')
+        draw_button("Normal", buttons['normal'], highlight=game.speed_setting == 'Normal')
+        draw_button("Hard", buttons['hard'], highlight=game.speed_setting == 'Hard')
+        draw_button("Faces", buttons['faces'])
+        draw_button("Background", buttons['background'])
+        draw_button("Back to Menu", buttons['back_settings'])
+        game.draw_error_overlay()
+
+class CustomFacesScene(Scene):
+    def handle(self, events):
+        self.game.handle_custom_faces(events)
+
+    def layer_key(self):
+        return (background_img, tuple(loaded_custom_faces))
+
+    def draw_static(self, surface):
+        super().draw_static(surface)
+        blit_centered(surface, render_text("Custom Faces", YELLOW, FONT_SIZE_LARGE), 100)
+        blit_centered(surface, render_text("Click any slot to upload or change an image.", TEXT_COLOR), 180)
+        for i, frame_rect in enumerate(self.game.face_upload_rects):
+            pygame.draw.rect(surface, BUTTON_COLOR, frame_rect, border_radius=15)
+            pygame.draw.rect(surface, HIGHLIGHT_COLOR, frame_rect, border_radius=15, width=3)
+            face_img = loaded_custom_faces[i]
+            if face_img:
+                face_img_scaled = pygame.transform.scale(face_img, (150, 150))
+                surface.blit(face_img_scaled, face_img_scaled.get_rect(center=frame_rect.center))
+            else:
+                qm_img = get_question_mark_img()
+                surface.blit(qm_img, qm_img.get_rect(center=frame_rect.center))
+
+    def draw_dynamic(self):
+        draw_button("Back to Settings", self.game.buttons['back_faces'])
+
+def board_label(board):
+    mode, difficulty, duration = board
+    return f"Timed {duration}s - {difficulty}" if mode == 'TIMED_CHALLENGE' else f"Classic - {difficulty}"
+
+class HighScoresScene(Scene):
+    def enter(self):
+        super().enter()
+        self.game.refresh_high_scores()
+
+    def handle(self, events):
+        self.game.handle_high_scores(events)
+
+    def update(self, sim_steps):
+        game = self.game
+        if game.high_scores_version != game.leaderboard.version:
+            game.refresh_high_scores()
+        if game.score_save_failed:
+            game.score_save_failed = False
+            game.error_message = "Could not save score!"
+            game.error_timer = 180
+
+    def layer_key(self):
+        game = self.game
+        return (background_img, game.board, game.board_daily, tuple((entry['name'], entry['score']) for entry in game.high_scores))
+
+    def draw_static(self, surface):
+        super().draw_static(surface)
+        game = self.game
+        high_scores = game.high_scores
+        blit_centered(surface, render_text(f"Top {LEADERBOARD_SIZE} High Scores", YELLOW, FONT_SIZE_LARGE), 40)
+        board = f"{board_label(game.board)} - {'Today' if game.board_daily else 'All time'}"
+        blit_centered(surface, render_text(board, HIGHLIGHT_COLOR, FONT_SIZE_SMALL), 110)
+        blit_centered(surface, render_text("TAB: mode   LEFT/RIGHT: difficulty   D: today / all time", LIGHT_GREY, FONT_SIZE_SMALL), 655)
+        if not high_scores:
+            no_scores = render_text("No scores yet!", TEXT_COLOR, FONT_SIZE_MEDIUM)
+            surface.blit(no_scores, no_scores.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)))
+            return
+        row_height = 45
+        table_height = (len(high_scores) + 1) * row_height
+        start_y = (SCREEN_HEIGHT - table_height) // 2
+        col_spacing_name = 80
+        col_spacing_score = 150
+        font_medium = get_font(FONT_SIZE_MEDIUM)
+        rank_width = max(font_medium.size(f"{i+1}.")[0] for i in range(len(high_scores)))
+        name_width = max(font_medium.size(entry['name'])[0] for entry in high_scores)
+        score_width = max(font_medium.size(str(entry['score']))[0] for entry in high_scores)
+        total_width = rank_width + col_spacing_name + name_width + col_spacing_score + score_width
+        start_x = (SCREEN_WIDTH - total_width) // 2
+        name_x = start_x + rank_width + col_spacing_name
+        score_right = name_x + name_width + col_spacing_score + score_width
+        header_rank = render_text("Rank", GREEN, FONT_SIZE_MEDIUM)
+        header_name = render_text("Name", GREEN, FONT_SIZE_MEDIUM)
+        header_score = render_text("Score", GREEN, FONT_SIZE_MEDIUM)
+        surface.blit(header_rank, (start_x + (rank_width - header_rank.get_width()), start_y))
+        surface.blit(header_name, (name_x, start_y))
+        surface.blit(header_score, (score_right - header_score.get_width(), start_y))
+        for i, entry in enumerate(high_scores):
+            rank = render_text(f"{i+1}.", HIGHLIGHT_COLOR, FONT_SIZE_MEDIUM)
+            name = render_text(entry['name'], TEXT_COLOR, FONT_SIZE_MEDIUM)
+            score = render_text(str(entry['score']), TEXT_COLOR, FONT_SIZE_MEDIUM)
+            y = start_y + (i+1) * row_height
+            surface.blit(rank, (start_x + (rank_width - rank.get_width()), y))
+            surface.blit(name, (name_x, y))
+            surface.blit(score, (score_right - score.get_width(), y))
+
+    def draw_dynamic(self):
+        draw_button("Back to Menu", self.game.buttons['back_scores'])
+        self.game.draw_error_overlay()
+
+class AboutScene(Scene):
+    INFO_LINES = [
+        f"Version: v{__version__}",
+        "",
+        "A fun and simple target shooting game.",
+        "Hit the bullseye for a combo streak!",
+        "Customize faces and backgrounds to your liking."
+    ]
+
+    def handle(self, events):
+        self.game.handle_about(events)
+
+    def draw_static(self, surface):
+        super().draw_static(surface)
+        blit_centered(surface, render_text("Paint (H)it", YELLOW, FONT_SIZE_LARGE), 100)
         y_offset = 180
-        author_text = font.render(f"Author: {__author__}", True, HIGHLIGHT_COLOR)
+        author_text = render_text(f"Author: {__author__}", HIGHLIGHT_COLOR)
         author_rect = author_text.get_rect(centerx=SCREEN_WIDTH//2, top=y_offset)
-        screen.blit(author_text, author_rect)
-        self.author_rect = author_rect
+        surface.blit(author_text, author_rect)
+        self.game.author_rect = author_rect
         y_offset += 40
-
-        for line in info_lines:
-            text_surf = font.render(line, True, GREEN)
-            text_rect = text_surf.get_rect(centerx=SCREEN_WIDTH/2, top=y_offset)
-            screen.blit(text_surf, text_rect)
+        for line in self.INFO_LINES:
+            text_surf = render_text(line, GREEN)
+            surface.blit(text_surf, text_surf.get_rect(centerx=SCREEN_WIDTH/2, top=y_offset))
             y_offset += 40
 
-        draw_button("Back to Menu", self.buttons['back_about'])
+    def draw_dynamic(self):
+        draw_button("Back to Menu", self.game.buttons['back_about'])
 
-    def draw_game_over(self):
-        screen.blit(background_img, (0, 0))
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(180)
-        overlay.fill((20, 20, 20))
-        screen.blit(overlay, (0, 0))
-        
-        is_high_score = check_for_high_score(self.score, self.high_scores)
-        
-        if self.last_state == 'quit':
-             title = font_large.render("Save Your Score?", True, YELLOW)
+class FileExplorerScene(Scene):
+    def handle(self, events):
+        self.game.handle_file_explorer(events)
+
+    def draw(self, alpha):
+        self.game.draw_file_explorer()
+
+class GameOverScene(Scene):
+    def enter(self):
+        super().enter()
+        self.game.rank_run()
+        if self.is_high_score():
+            self.game.input_box_active = 'name_input'
+
+    def is_high_score(self):
+        return self.game.run_qualifies
+
+    def handle(self, events):
+        self.game.handle_game_over(events)
+
+    def layer_key(self):
+        return (background_img, self.game.last_state, self.game.score, self.is_high_score(), self.game.run_rank)
+
+    def draw_static(self, surface):
+        super().draw_static(surface)
+        game = self.game
+        if game.last_state == 'quit':
+            blit_centered(surface, render_text("Save Your Score?", YELLOW, FONT_SIZE_LARGE), 200)
         else:
-             title = font_large.render("GAME OVER", True, RED)
+            blit_centered(surface, render_text("GAME OVER", RED, FONT_SIZE_LARGE), 200)
 
-        screen.blit(title, (SCREEN_WIDTH/2 - title.get_width()/2, 200))
-        
-        if is_high_score:
-            self.input_box_active = 'name_input'
-            hs_text = font_medium.render("New High Score!", True, YELLOW)
-            screen.blit(hs_text, (SCREEN_WIDTH/2 - hs_text.get_width()/2, 300))
-            draw_input_box(self.player_name, 300, 380, 400, 50, "Enter Name...")
-            prompt = font.render("Press ENTER to save", True, TEXT_COLOR)
-            screen.blit(prompt, (SCREEN_WIDTH/2 - prompt.get_width()/2, 450))
-            draw_button("Skip", self.buttons['skip_score'])
+        if self.is_high_score():
+            blit_centered(surface, render_text("New High Score!", YELLOW, FONT_SIZE_MEDIUM), 300)
+            blit_centered(surface, render_text("Press ENTER to save", TEXT_COLOR), 450)
         else:
-            final_score = font_medium.render(f"Final Score: {self.score}", True, TEXT_COLOR)
-            screen.blit(final_score, (SCREEN_WIDTH/2 - final_score.get_width()/2, 350))
-            
-            if self.last_state == 'quit':
-                prompt = font.render("Your score wasn't a high score.", True, TEXT_COLOR)
-                screen.blit(prompt, (SCREEN_WIDTH/2 - prompt.get_width()/2, 400))
-                back_to_menu = font.render("Press 'M' to go to menu", True, GREEN)
-                screen.blit(back_to_menu, (SCREEN_WIDTH/2 - back_to_menu.get_width()/2, 450))
+            blit_centered(surface, render_text(f"Final Score: {game.score}", TEXT_COLOR, FONT_SIZE_MEDIUM), 350)
+            if game.last_state == 'quit':
+                blit_centered(surface, render_text("Your score wasn't a high score.", TEXT_COLOR), 400)
+                blit_centered(surface, render_text("Press 'M' to go to menu", GREEN), 450)
             else:
-                prompt = font.render("Press 'R' to Restart or 'M' for Menu", True, TEXT_COLOR)
-                screen.blit(prompt, (SCREEN_WIDTH/2 - prompt.get_width()/2, 450))
+                blit_centered(surface, render_text("Press 'R' to Restart or 'M' for Menu", TEXT_COLOR), 450)
+        rank, runs = game.run_rank
+        blit_centered(surface, render_text(f"Rank {rank} of {runs + 1} runs on {board_label(game.run_board)}", LIGHT_GREY, FONT_SIZE_SMALL), 520)
+
+    def draw_dynamic(self):
+        if self.is_high_score():
+            draw_input_box(self.game.player_name, 300, 380, 400, 50, "Enter Name...")
+            draw_button("Skip", self.game.buttons['skip_score'])
 
 # --- UI Drawing Helper Functions ---
+# Menus are laid out in game units. At a render scale other than 1 they draw on ui_surface,
+# which is then scaled onto the canvas; only gameplay draws at canvas resolution.
+def draw_scaled_ui(draw, alpha):
+    global screen
+    canvas, screen = screen, ui_surface
+    try:
+        draw(alpha)
+    finally:
+        screen = canvas
+    pygame.transform.smoothscale(ui_surface, canvas.get_size(), canvas)
+
 def draw_button(text, rect, highlight=False):
-    mouse_pos = pygame.mouse.get_pos()
-    color = HOVER_COLOR if rect.collidepoint(mouse_pos) else BUTTON_COLOR
+    color = HOVER_COLOR if rect.collidepoint(mouse_pos()) else BUTTON_COLOR
     if highlight: color = HIGHLIGHT_COLOR
     pygame.draw.rect(screen, color, rect, border_radius=10)
     shadow_rect = rect.copy(); shadow_rect.move_ip(5, 5)
     pygame.draw.rect(screen, (0, 0, 0, 50), shadow_rect, border_radius=10)
-    text_surf = font_medium.render(text, True, TEXT_COLOR)
+    text_surf = render_text(text, TEXT_COLOR, FONT_SIZE_MEDIUM)
     text_rect = text_surf.get_rect(center=rect.center)
     screen.blit(text_surf, text_rect)
 
@@ -1070,14 +2887,196 @@ def draw_input_box(text, x, y, w, h, placeholder=""):
     pygame.draw.rect(screen, BUTTON_COLOR, rect, border_radius=10)
     pygame.draw.rect(screen, HIGHLIGHT_COLOR, rect, 2, border_radius=10)
     if text:
-        text_surf = font_medium.render(text, True, TEXT_COLOR)
+        text_surf = render_text(text, TEXT_COLOR, FONT_SIZE_MEDIUM)
         screen.blit(text_surf, (rect.x + 10, rect.y + 5))
     elif placeholder:
-        place_surf = font_medium.render(placeholder, True, GREY)
+        place_surf = render_text(placeholder, GREY, FONT_SIZE_MEDIUM)
         screen.blit(place_surf, (rect.x + 10, rect.y + 5))
 
+# --- Headless Engine ---
+# Steps a Game one fixed tick per frame with a seeded RNG and scripted input (or any object
+# with get_events() and get_pos(), such as a bot). The same seed, script and settings always
+# give the same state_digest().
+class HeadlessEngine:
+    def __init__(self, seed=0, script=(), mode='PLAYING', speed_setting='Normal', challenge_duration=60, faces=(), render=False, swarm_size=0,
+                 input_source=None):
+        init(headless=True)
+        self.input = input_source if input_source is not None else ScriptedInput(script)
+        self.game = Game(rng=random.Random(seed), input_source=self.input, faces=list(faces), swarm_size=swarm_size)
+        self.game.speed_setting = speed_setting
+        self.game.challenge_duration = challenge_duration
+        self.render = render
+        self.frames = 0
+        self.game.start_game(mode)
+
+    def step(self):
+        self.game.handle_gameplay(self.input.get_events())
+        self.game.update_gameplay()
+        if self.render:
+            self.game.draw_gameplay()
+        self.frames += 1
+
+    def run(self, max_frames):
+        start = self.frames
+        while self.frames - start < max_frames and not self.game.game_over:
+            self.step()
+        return self.frames - start
+
+    def state_digest(self):
+        game = self.game
+        digest = hashlib.sha256()
+        digest.update(struct.pack('<qqiii', game.sim_ticks, game.score, game.lives, game.combo_counter, game.combo_timer))
+        for target in game.targets:
+            digest.update(struct.pack('<6d?', target.x, target.y, target.scale, target.speed, target.fall_speed, target.target_lane_x, target.falling))
+        swarm = game.swarm
+        if swarm is not None:
+            for name, _ in swarm.FIELDS:
+                digest.update(getattr(swarm, name)[:swarm.count].tobytes())
+        return digest.hexdigest()
+
+def run_headless(args):
+    script = []
+    if args.script:
+        with open(args.script, 'r') as f:
+            script = json.load(f)
+    engine = HeadlessEngine(seed=args.seed, script=script, mode=args.mode, speed_setting=args.speed,
+                            challenge_duration=args.duration, render=args.render, swarm_size=args.swarm)
+    start = time.perf_counter()
+    frames = engine.run(args.frames)
+    elapsed = time.perf_counter() - start
+    game = engine.game
+    print(f"frames={frames} fps={frames / elapsed if elapsed else 0:.0f} score={game.score} "
+          f"lives={game.lives} combo={game.combo_counter} digest={engine.state_digest()}")
+
+# Re-simulates a ReplayLog at full speed. Face images never affect scoring, so each
+# recorded face is stood in for by the question mark image.
+def replay(log, render=False):
+    faces = [get_question_mark_img()] * len(log.faces)
+    engine = HeadlessEngine(seed=log.seed, script=log.script(), mode=log.mode, speed_setting=log.speed_setting,
+                            challenge_duration=log.challenge_duration, faces=faces, render=render,
+                            swarm_size=log.swarm_size)
+    engine.run(log.frames)
+    return engine
+
+def replay_matches(engine, log):
+    game = engine.game
+    return (game.score, game.lives, game.combo_counter) == (log.score, log.lives, log.combo_counter)
+
+def run_replay(args):
+    try:
+        log = ReplayLog.load(args.replay)
+    except (OSError, ValueError) as e:
+        print(f"Could not read replay: {e}")
+        sys.exit(2)
+    start = time.perf_counter()
+    engine = replay(log, render=args.render)
+    elapsed = time.perf_counter() - start
+    game = engine.game
+    ok = replay_matches(engine, log)
+    print(f"frames={engine.frames} fps={engine.frames / elapsed if elapsed else 0:.0f} mode={log.mode} "
+          f"speed={log.speed_setting} score={game.score} lives={game.lives} combo={game.combo_counter} "
+          f"recorded score={log.score} lives={log.lives} combo={log.combo_counter}: {'OK' if ok else 'MISMATCH'}")
+    sys.exit(0 if ok else 1)
+
+# --- Startup ---
+def timed_phase(name, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    startup_timings[name] = time.perf_counter() - start
+    return result
+
+def configured_render_scale():
+    # Read straight from the file: the display opens before load_config() runs
+    try:
+        with open(CONFIG_FILE, 'r') as f:
+            return float(json.load(f).get('game_settings', {}).get('render_scale', 1.0))
+    except (FileNotFoundError, json.JSONDecodeError, AttributeError, TypeError, ValueError):
+        return 1.0
+
+def init_display(headless, fullscreen=False, scale_filter='linear', render_scale=1.0):
+    global screen, canvas_scale, ui_surface
+    low, high = RENDER_SCALE_RANGE
+    canvas_scale = min(high, max(low, render_scale))
+    flags = 0
+    if headless:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    else:
+        # Everything draws to a canvas of SCREEN_WIDTH x SCREEN_HEIGHT game units at canvas_scale.
+        # SCALED has SDL stretch it to the window (resizable, or fullscreen) on the GPU, letterboxed,
+        # and map mouse positions back to canvas pixels, so gameplay geometry is the same at every window size
+        os.environ.setdefault('SDL_RENDER_SCALE_QUALITY', '1' if scale_filter == 'linear' else '0')
+        flags = pygame.SCALED | pygame.RESIZABLE | (pygame.FULLSCREEN if fullscreen else 0)
+    pygame.init()
+    size = canvas_size()
+    try:
+        screen = pygame.display.set_mode(size, flags)
+    except pygame.error as e:
+        print(f"Scaled display unavailable ({e}); using a fixed {size[0]}x{size[1]} window.")
+        screen = pygame.display.set_mode(size)
+    pygame.display.set_caption("Paint (H)it")
+    ui_surface = None if canvas_scale == 1 else pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+
+# Opens the display, then loads the gameplay assets and the config. Safe to call more than
+# once; only the first call does anything. Raises pygame.error or OSError if an asset is missing.
+# render_scale defaults to the config's, or 1 for headless runs.
+def init(headless=None, fullscreen=False, scale_filter='linear', render_scale=None):
+    if screen is not None:
+        return
+    headless = HEADLESS if headless is None else headless
+    if render_scale is None:
+        render_scale = 1.0 if headless else configured_render_scale()
+    timed_phase('display', init_display, headless, fullscreen, scale_filter, render_scale)
+    timed_phase('assets', load_assets)
+    timed_phase('config', load_config)
+    # Everything loaded so far lives for the whole session; moving it out of the
+    # collector's view keeps full collections short during long sessions
+    gc.collect()
+    gc.freeze()
+
+def startup_report():
+    lines = ["Startup timings:"]
+    for name, seconds in startup_timings.items():
+        lines.append(f"  {name:<8} {seconds * 1000:8.1f} ms")
+    lines.append(f"  {'total':<8} {sum(startup_timings.values()) * 1000:8.1f} ms")
+    lines.append(f"  asset cache: {asset_cache.hits} hits, {asset_cache.misses} misses")
+    return "\n".join(lines)
+
+startup_timings['import'] = time.perf_counter() - IMPORT_STARTED
+
 # --- Main Execution ---
 if __name__ == '__main__':
-    SPAWN_TARGET_EVENT = pygame.USEREVENT + 1
-    game = Game()
+    parser = argparse.ArgumentParser(description="Paint (H)it")
+    parser.add_argument('--headless', action='store_true', help="run the simulation with no display and exit")
+    parser.add_argument('--seed', type=int, default=0, help="RNG seed for --headless")
+    parser.add_argument('--frames', type=int, default=10000, help="maximum frames to simulate with --headless")
+    parser.add_argument('--script', help="JSON input script for --headless: [[frame, kind, args...], ...]")
+    parser.add_argument('--mode', choices=['PLAYING', 'TIMED_CHALLENGE'], default='PLAYING')
+    parser.add_argument('--speed', choices=['Easy', 'Normal', 'Hard'], default='Normal')
+    parser.add_argument('--duration', type=int, default=60, help="timed challenge length in seconds")
+    parser.add_argument('--render', action='store_true', help="also draw every frame with --headless")
+    parser.add_argument('--swarm', type=int, default=0, metavar='N', help="swarm mode: keep up to N small targets on screen (needs numpy)")
+    parser.add_argument('--record', metavar='DIR', help="save a replay log of every finished game into DIR")
+    parser.add_argument('--replay', metavar='FILE', help="re-simulate a replay log with no display and check its final score")
+    parser.add_argument('--fullscreen', action='store_true', help="start fullscreen (F11 toggles it in game)")
+    parser.add_argument('--scale-filter', choices=['linear', 'nearest'], default='linear',
+                        help="how the canvas is stretched to the window (default linear)")
+    parser.add_argument('--render-scale', type=float, metavar='FACTOR',
+                        help="canvas pixels per game unit, e.g. 0.5 for slow machines or 2 for 4K (default: config, or 1)")
+    parser.add_argument('--startup-report', action='store_true', help="print how long each startup phase took")
+    args = parser.parse_args()
+    try:
+        init(headless=args.headless or args.replay is not None, fullscreen=args.fullscreen, scale_filter=args.scale_filter,
+             render_scale=args.render_scale)
+    except (pygame.error, OSError) as e:
+        print(f"Fatal Error: Could not load image asset: {e}")
+        sys.exit()
+    if args.startup_report:
+        print(startup_report())
+    if args.replay:
+        run_replay(args)
+    if args.headless:
+        run_headless(args)
+        sys.exit()
+    game = Game(swarm_size=args.swarm, recorder=InputRecorder(args.record) if args.record else None)
     game.run()
\ No newline at end of file